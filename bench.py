@@ -0,0 +1,291 @@
+# bench.py
+"""
+bench.py — Performance benchmarks for Dungeon Designer.
+
+Generates synthetic dungeons and measures:
+
+- export: gen.createSchematic end to end (with the save dialog stubbed), the
+  block-placement phase (gen.buildVolume) and the serialization phase
+  (gen.saveSchem) separately, all with cold export caches; a re-export after
+  a one-cell edit with warm caches; and the peak memory traced while exporting
+- render: the drawing part of the editor loop (canvas + sidebar widgets +
+  display update) for N frames, headless under SDL_VIDEODRIVER=dummy, while
+  idle, while painting and while panning
+
+Dungeon shapes:
+    empty    floors with nothing painted
+    sparse   random-walk corridors (floor) lined with walls
+    dense    every cell has both a floor and a wall
+
+Results are printed as one JSON document (or written with -o) so runs can be
+diffed and compared across commits:
+
+    python bench.py --quick
+    python bench.py -o before.json
+    python bench.py --shapes dense --floors 200 --sizes 1000 --frames 300
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+import numpy as np
+
+import gen
+import layers
+
+
+# ----------------------------- CONFIG CONSTANTS -----------------------------
+
+shapes = ("empty", "sparse", "dense")
+
+# (floor count, grid size) pairs exported for every shape by default; the
+# grid is size×size cells
+defaultCases = [(1, 60), (20, 60), (200, 60), (1, 250), (20, 250), (1, 1000), (5, 1000)]
+quickCases = [(1, 60), (20, 60), (1, 250)]
+
+defaultFrames = 120
+quickFrames = 30
+
+windowSize = (1440, 900)  # same layout as main.py
+sidebarWidth = 330
+
+seed = 1234
+
+
+# ------------------------------- SYNTHETIC DATA ------------------------------
+
+def _corridorMask(size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Random-walk corridors over roughly a tenth of the grid, walls around them.
+    """
+    floorCells = np.zeros((size, size), dtype=bool)
+    steps = np.array([(1, 0), (-1, 0), (0, 1), (0, -1)])
+    for _walker in range(max(1, size // 30)):
+        turns = rng.integers(0, 4, size=size * 3 // 2).repeat(rng.integers(3, 12))
+        path = np.cumsum(steps[turns], axis=0) + rng.integers(0, size, size=2)
+        path = np.clip(path, 1, size - 2)
+        floorCells[path[:, 0], path[:, 1]] = True
+
+    padded = np.pad(floorCells, 1)
+    near = np.zeros_like(floorCells)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            near |= padded[1 + dx:1 + dx + size, 1 + dy:1 + dy + size]
+    wallCells = near & ~floorCells
+    return floorCells * np.uint8(layers.FLOOR) | wallCells * np.uint8(layers.WALLS)
+
+
+def makeDungeon(shape: str, floorCount: int, size: int, rng: np.random.Generator = None) -> List[layers.Floor]:
+    """
+    A synthetic dungeon of `floorCount` floors, each spanning size×size cells.
+    """
+    rng = rng if rng is not None else np.random.default_rng(seed)
+    floors = []
+    for idx in range(floorCount):
+        if shape == "empty":
+            mask = None
+        elif shape == "sparse":
+            mask = _corridorMask(size, rng)
+        elif shape == "dense":
+            mask = np.full((size, size), layers.FLOOR | layers.WALLS, dtype=np.uint8)
+        else:
+            raise ValueError(f"unknown dungeon shape {shape!r}")
+        floors.append(layers.Floor(f"Floor {idx + 1}", mask=mask))
+    return floors
+
+
+def _paintedCells(floors: List[layers.Floor]) -> int:
+    return sum(int(np.count_nonzero(chunk)) for floor in floors for chunk in floor.chunks.values())
+
+
+# ---------------------------------- EXPORT ----------------------------------
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def benchExport(shape: str, floorCount: int, size: int, directory: str) -> Dict:
+    floors = makeDungeon(shape, floorCount, size)
+    path = os.path.join(directory, f"{shape}_{floorCount}x{size}.schem")
+
+    # End to end, through the same entry point the editor uses, with the
+    # save dialog replaced by a fixed path
+    gen.clearExportCache()
+    askSavePath = gen.askSavePath
+    gen.askSavePath = lambda *args, **kwargs: path
+    try:
+        _path, totalSeconds = _timed(gen.createSchematic, floors)
+    finally:
+        gen.askSavePath = askSavePath
+
+    gen.clearExportCache()
+    volume, placementSeconds = _timed(gen.buildVolume, floors)
+    _none, serializeSeconds = _timed(gen.saveSchem, volume, path)
+
+    cells = _paintedCells(floors)
+    fileBytes = os.path.getsize(path)
+
+    # Peak memory is traced on a separate pass so tracing overhead stays out of the timings
+    gen.clearExportCache()
+    tracemalloc.start()
+    gen.createSchematic(floors, path)
+    _current, peakBytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Re-export after flipping one cell in the middle floor (export caches warm);
+    # the flip is undone so every other number describes the unedited dungeon
+    middle = floors[len(floors) // 2]
+    wasWall = middle.get(size // 2, size // 2, "walls")
+    middle.set(size // 2, size // 2, "walls", not wasWall)
+    _path, reexportSeconds = _timed(gen.createSchematic, floors, path)
+    middle.set(size // 2, size // 2, "walls", wasWall)
+
+    return {
+        "shape": shape,
+        "floors": floorCount,
+        "size": size,
+        "cells": cells,
+        "blocks": int(np.count_nonzero(volume.blocks)),
+        "fileBytes": fileBytes,
+        "createSchematicSeconds": round(totalSeconds, 6),
+        "placementSeconds": round(placementSeconds, 6),
+        "serializeSeconds": round(serializeSeconds, 6),
+        "reexportSeconds": round(reexportSeconds, 6),
+        "peakTracedBytes": peakBytes,
+    }
+
+
+# ---------------------------------- RENDER ----------------------------------
+
+def _frameStats(frameSeconds: List[float]) -> Dict:
+    ms = np.array(frameSeconds) * 1000
+    return {
+        "frames": len(ms),
+        "meanMs": round(float(ms.mean()), 4),
+        "p50Ms": round(float(np.percentile(ms, 50)), 4),
+        "p95Ms": round(float(np.percentile(ms, 95)), 4),
+        "p99Ms": round(float(np.percentile(ms, 99)), 4),
+        "maxMs": round(float(ms.max()), 4),
+    }
+
+
+def benchRender(shape: str, size: int, frames: int) -> List[Dict]:
+    """
+    Frame times of the editor's drawing work on one floor, per scenario.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    import canvas
+    import gui
+
+    pygame.display.init()
+    screen = pygame.display.set_mode(windowSize)
+    floorCanvas = canvas.Canvas((0, 0, windowSize[0] - sidebarWidth, windowSize[1]))
+    sidebarRect = pygame.Rect(floorCanvas.rect.right, 0, sidebarWidth, windowSize[1])
+    buttons = [
+        gui.Button(name=f"bench_{i}", width=140, height=40, cornerRadius=8, color=[100, 100, 100],
+                   text=f"Button {i}", x=1195 + 160 * (i % 2), y=120 + 60 * (i // 2), scale=1, fontSize=20)
+        for i in range(10)
+    ]
+
+    floor = makeDungeon(shape, 1, size)[0]
+    results = []
+    for scenario in ("idle", "paint", "pan"):
+        floorCanvas.markAll()
+        floorCanvas.draw(screen, floor, "walls")  # warm up caches outside the timings
+        frameSeconds = []
+        for frame in range(frames):
+            start = time.perf_counter()
+            if scenario == "paint":
+                cellX, cellY = floorCanvas.screenToCell((100 + frame * 3 % 900, 100 + frame * 2 % 700))
+                xs, ys = layers.lineCells(cellX, cellY, cellX + 4, cellY + 2)
+                floorCanvas.markCells(floor, *floor.paint(xs, ys, "walls", frame % 2 == 0))
+            elif scenario == "pan":
+                floorCanvas.pan(7, 3)
+            screen.fill((25, 25, 25), sidebarRect)
+            dirtyRects = floorCanvas.draw(screen, floor, "walls")
+            for button in buttons:
+                button.draw(screen)
+            pygame.display.update([sidebarRect] + dirtyRects)
+            frameSeconds.append(time.perf_counter() - start)
+        results.append(dict(shape=shape, size=size, scenario=scenario, **_frameStats(frameSeconds)))
+
+    for button in buttons:
+        button.remove()
+    pygame.display.quit()
+    return results
+
+
+# ----------------------------------- MAIN -----------------------------------
+
+def _environment() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog="python bench.py", description="Benchmark export and editor frame time on synthetic dungeons.")
+    parser.add_argument("-o", "--output", default=None, help="write the JSON results here instead of stdout")
+    parser.add_argument("--quick", action="store_true", help="small cases only (a few seconds)")
+    parser.add_argument("--shapes", nargs="+", choices=shapes, default=list(shapes))
+    parser.add_argument("--floors", nargs="+", type=int, default=None, help="floor counts (overrides the default cases)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=None, help="grid sizes in cells (overrides the default cases)")
+    parser.add_argument("--frames", type=int, default=None, help="frames per render scenario")
+    parser.add_argument("--skip-export", action="store_true")
+    parser.add_argument("--skip-render", action="store_true")
+    args = parser.parse_args(argv)
+
+    cases = quickCases if args.quick else defaultCases
+    if args.floors or args.sizes:
+        cases = [(floorCount, size)
+                 for floorCount in (args.floors or sorted({f for f, _s in cases}))
+                 for size in (args.sizes or sorted({s for _f, s in cases}))]
+    frames = args.frames or (quickFrames if args.quick else defaultFrames)
+
+    report = {"environment": _environment(), "export": [], "render": []}
+    if not args.skip_export:
+        with tempfile.TemporaryDirectory(prefix="dungeon-bench-") as directory:
+            for shape in args.shapes:
+                for floorCount, size in cases:
+                    result = benchExport(shape, floorCount, size, directory)
+                    report["export"].append(result)
+                    print(f"export {shape:6} {floorCount:3} x {size}²: {result['createSchematicSeconds']:.3f}s", file=sys.stderr)
+    if not args.skip_render:
+        for shape in args.shapes:
+            for size in sorted({size for _f, size in cases}):
+                for result in benchRender(shape, size, frames):
+                    report["render"].append(result)
+                    print(f"render {shape:6} {size}² {result['scenario']:5}: p95 {result['p95Ms']:.2f}ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
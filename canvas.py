@@ -0,0 +1,383 @@
+"""
+canvas.py — Retained-mode drawing of the floor grid for Dungeon Designer.
+
+The canvas is a viewport onto an unbounded grid: `offset` is the screen
+position (relative to the canvas rect) of the top-left corner of cell (0, 0)
+and `scalePx` is the size of one cell on screen. The view is panned with pan()
+and zoomed around a point with zoomAt().
+
+Cells are not drawn one rect at a time. The canvas keeps one small RGBA
+surface with one pixel per visible cell, built straight from the floor's
+chunks (Floor.region) through pygame.surfarray: every pixel is white and its
+alpha comes from a lookup table indexed by the cell's FLOOR/WALLS bits, so the
+active/inactive opacity of both channels for the current `mode` is applied in
+one vectorized step. That surface is then scaled up to screen size with
+pygame.transform.scale and blitted once, under a cached grid-line overlay.
+Drawing a fully painted canvas is a constant handful of calls, and its cost
+follows the viewport size, never the size of the dungeon.
+
+Edits only refresh the bounding box of the changed cells (same steps, on a
+subsurface). draw() returns the screen rects it repainted so the caller can
+hand them to pygame.display.update(rects); when nothing changed it costs
+nothing.
+
+Onion skin: draw() can also be given neighbouring floors, which show under
+the current one in a tint (below/above) at an alpha that fades with
+distance. Each is pre-rendered once into a screen-sized surface, cached
+under the floor's revision and the view, so it is only rebuilt when that
+floor is edited or the view moves; compositing N neighbours costs N blits.
+floorThumbnail() makes the small previews shown next to the floor buttons.
+
+Outlines (the selection, the footprint of a pending paste) are drawn over the
+cells as thin edge strips; when one moves only the strips it left are
+repainted, so dragging a large selection never redraws its inside.
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+import layers
+import profiling
+
+
+# ----------------------------- CONFIG CONSTANTS -----------------------------
+
+backgroundColor = (25, 25, 25)
+gridLineColor = (40, 40, 40)
+chunkLineColor = (60, 60, 60)
+cellColor = (255, 255, 255)
+activeAlpha = 255
+inactiveAlpha = 55
+
+zoomLevels = [4, 6, 8, 10, 15, 20, 30, 40]  # cell sizes in px, smallest first
+minGridLineScale = 6  # below this cell size only chunk borders are drawn
+
+maxDirtyRects = 64  # beyond this, dirty boxes are merged into their union
+
+onionBelowColor = (90, 150, 255)
+onionAboveColor = (255, 150, 90)
+onionAlphas = [70, 35, 18]  # alpha of a neighbour's cells at distance 1, 2, 3, ...
+maxOnionSurfaces = 8  # pre-rendered neighbour floors kept (each is screen-sized)
+
+outlineWidth = 2  # px
+
+thumbnailWallAlpha = 255
+thumbnailFloorAlpha = 110
+
+
+def alphaTable(mode):
+    """
+    Alpha of a cell for each FLOOR/WALLS bit combination: the active channel
+    at activeAlpha, the other at inactiveAlpha, composited as two white layers.
+    """
+    table = np.zeros((layers.FLOOR | layers.WALLS) + 1, dtype=np.uint8)
+    for bits in range(len(table)):
+        clear = 255
+        for channel, bit in layers.channelBits.items():
+            if bits & bit:
+                clear = clear * (255 - (activeAlpha if channel == mode else inactiveAlpha)) // 255
+        table[bits] = 255 - clear
+    return table
+
+
+# ---------------------------------- CANVAS ----------------------------------
+
+class Canvas:
+    def __init__(self, rect, scalePx=15):
+        self.rect = pygame.Rect(rect)
+        self.scalePx = scalePx
+        self.offset = (0, 0)
+
+        self.gridOverlay = None
+        self.window = None       # visible cell window (x0, y0, x1, y1) of cellSurface
+        self.windowMask = None   # uint8 [x, y] copy of the shown floor's cells in the window
+        self.cellSurface = None  # RGBA, one pixel per cell of the window
+        self.alphaLookup = None  # alphaTable() of the shown mode
+
+        self.shownFloor = None
+        self.shownMode = None
+        self.shownView = None
+        self.fullRedraw = True
+        self.dirtyBoxes = []  # window-relative cell boxes (x0, y0, x1, y1) edited since the last draw
+
+        self.onionCache = OrderedDict()  # floor -> ((revision, distance, view), surface, screen pos), LRU
+        self.onionLayers = []  # (surface, screen pos) of the neighbours shown, bottom first
+
+        self.outlines = []  # (screen rect, color) to draw over the cells, see setOutlines()
+        self.shownOutlines = []  # the outlines currently on screen
+
+    # ---- VIEW ----
+
+    @property
+    def view(self):
+        return (self.scalePx,) + self.offset
+
+    def screenToCell(self, pos):
+        """
+        Grid cell under a screen position.
+        """
+        return ((pos[0] - self.rect.x - self.offset[0]) // self.scalePx,
+                (pos[1] - self.rect.y - self.offset[1]) // self.scalePx)
+
+    def cellsToRect(self, x0, y0, x1, y1):
+        """
+        Screen rect covering the cell box [x0, x1) × [y0, y1).
+        """
+        scale = self.scalePx
+        return pygame.Rect(self.rect.x + self.offset[0] + x0 * scale, self.rect.y + self.offset[1] + y0 * scale,
+                           (x1 - x0) * scale, (y1 - y0) * scale)
+
+    def visibleCells(self):
+        """
+        Cell window (x0, y0, x1, y1), ends exclusive, covering the canvas rect.
+        """
+        scale = self.scalePx
+        x0 = -self.offset[0] // scale
+        y0 = -self.offset[1] // scale
+        x1 = (self.rect.width - self.offset[0] + scale - 1) // scale
+        y1 = (self.rect.height - self.offset[1] + scale - 1) // scale
+        return x0, y0, x1, y1
+
+    def pan(self, dx, dy):
+        if dx or dy:
+            self.offset = (self.offset[0] + dx, self.offset[1] + dy)
+
+    def zoomAt(self, pos, steps):
+        """
+        Move `steps` zoom levels in (positive) or out, keeping the point of the
+        grid under `pos` where it is on screen.
+        """
+        level = min(range(len(zoomLevels)), key=lambda i: abs(zoomLevels[i] - self.scalePx))
+        scale = zoomLevels[max(0, min(len(zoomLevels) - 1, level + steps))]
+        if scale == self.scalePx:
+            return
+        localX = pos[0] - self.rect.x
+        localY = pos[1] - self.rect.y
+        self.offset = (localX - (localX - self.offset[0]) * scale // self.scalePx,
+                       localY - (localY - self.offset[1]) * scale // self.scalePx)
+        self.scalePx = scale
+
+    # ---- RENDERING ----
+
+    def _renderGridOverlay(self):
+        overlay = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 0))
+        x0, y0, x1, y1 = self.visibleCells()
+        for x in range(x0, x1 + 1):
+            if x % layers.chunkSize == 0 or self.scalePx >= minGridLineScale:
+                color = chunkLineColor if x % layers.chunkSize == 0 else gridLineColor
+                px = self.offset[0] + x * self.scalePx
+                pygame.draw.line(overlay, color, [px, 0], [px, self.rect.height])
+        for y in range(y0, y1 + 1):
+            if y % layers.chunkSize == 0 or self.scalePx >= minGridLineScale:
+                color = chunkLineColor if y % layers.chunkSize == 0 else gridLineColor
+                py = self.offset[1] + y * self.scalePx
+                pygame.draw.line(overlay, color, [0, py], [self.rect.width, py])
+        return overlay
+
+    def _rebuildWindow(self, floor):
+        """
+        Re-read the visible cells of a floor into a fresh cell surface.
+        """
+        self.window = self.visibleCells()
+        self.alphaLookup = alphaTable(self.shownMode)
+        self.windowMask = floor.region(*self.window)
+        self.cellSurface = pygame.Surface(self.windowMask.shape, pygame.SRCALPHA)
+        self.cellSurface.fill(cellColor + (0,))
+        self._updateAlpha((0, 0) + self.windowMask.shape)
+
+    def _updateAlpha(self, box):
+        x0, y0, x1, y1 = box
+        alpha = pygame.surfarray.pixels_alpha(self.cellSurface)
+        alpha[x0:x1, y0:y1] = self.alphaLookup[self.windowMask[x0:x1, y0:y1]]
+        del alpha  # unlocks the surface
+
+    def _renderOnion(self, floor, distance):
+        """
+        A neighbour floor's visible cells, tinted and scaled to screen size.
+        Returns (surface, screen pos).
+        """
+        x0, y0, x1, y1 = self.visibleCells()
+        scale = self.scalePx
+        mask = floor.region(x0, y0, x1, y1)
+        color = onionBelowColor if distance < 0 else onionAboveColor
+        alpha = onionAlphas[min(abs(distance), len(onionAlphas)) - 1]
+        cells = pygame.Surface(mask.shape, pygame.SRCALPHA)
+        cells.fill(color + (0,))
+        alphaView = pygame.surfarray.pixels_alpha(cells)
+        alphaView[mask != 0] = alpha
+        del alphaView
+        pos = (self.rect.x + self.offset[0] + x0 * scale, self.rect.y + self.offset[1] + y0 * scale)
+        return pygame.transform.scale(cells, (mask.shape[0] * scale, mask.shape[1] * scale)), pos
+
+    def _updateOnion(self, neighbours):
+        """
+        Pick up the pre-rendered neighbour floors, rebuilding the ones edited
+        since (or never) rendered at this view. Any change means a full redraw.
+        """
+        layersShown = []
+        for floor, distance in sorted(neighbours, key=lambda n: -abs(n[1])):
+            key = (floor.revision, distance, self.view)
+            cached = self.onionCache.get(floor)
+            if cached is None or cached[0] != key:
+                with profiling.frameTimers.phase("onionSkin"):
+                    cached = self.onionCache[floor] = (key,) + self._renderOnion(floor, distance)
+                self.markAll()
+            self.onionCache.move_to_end(floor)
+            layersShown.append(cached)
+        while len(self.onionCache) > max(maxOnionSurfaces, len(neighbours)):
+            self.onionCache.popitem(last=False)
+        if [id(entry) for entry in layersShown] != [id(entry) for entry in self.onionLayers]:
+            self.markAll()
+        self.onionLayers = layersShown
+
+    def _blitBox(self, screen, box):
+        """
+        Scale one window-relative cell box to screen size and composite it.
+        Returns the screen rect painted.
+        """
+        x0, y0, x1, y1 = box
+        scale = self.scalePx
+        cells = self.cellSurface.subsurface((x0, y0, x1 - x0, y1 - y0))
+        dest = (self.rect.x + self.offset[0] + (self.window[0] + x0) * scale,
+                self.rect.y + self.offset[1] + (self.window[1] + y0) * scale)
+        rect = pygame.Rect(dest, ((x1 - x0) * scale, (y1 - y0) * scale)).clip(self.rect)
+
+        screen.fill(backgroundColor, rect)
+        for _key, onion, (onionX, onionY) in self.onionLayers:
+            screen.blit(onion, rect, area=rect.move(-onionX, -onionY))
+        screen.blit(pygame.transform.scale(cells, ((x1 - x0) * scale, (y1 - y0) * scale)), dest)
+        screen.blit(self.gridOverlay, rect, area=rect.move(-self.rect.x, -self.rect.y))
+        return rect
+
+    def markCells(self, floor, xs, ys):
+        """
+        Refresh edited cells of a floor.
+        """
+        if floor is not self.shownFloor or self.fullRedraw or len(xs) == 0:
+            return  # read from the floor when it is next shown
+        wx0, wy0, wx1, wy1 = self.window
+        x0, x1 = max(int(xs.min()), wx0), min(int(xs.max()) + 1, wx1)
+        y0, y1 = max(int(ys.min()), wy0), min(int(ys.max()) + 1, wy1)
+        if x0 >= x1 or y0 >= y1:
+            return  # outside the viewport
+        self.windowMask[x0 - wx0:x1 - wx0, y0 - wy0:y1 - wy0] = floor.region(x0, y0, x1, y1)
+        box = (x0 - wx0, y0 - wy0, x1 - wx0, y1 - wy0)
+        self._updateAlpha(box)
+        self.dirtyBoxes.append(box)
+
+    def markRect(self, rect):
+        """
+        Repaint the cells under a screen rect (e.g. after an overlay drawn on top is hidden).
+        """
+        rect = pygame.Rect(rect).clip(self.rect)
+        if self.fullRedraw or self.window is None or not rect:
+            return
+        x0, y0 = self.screenToCell(rect.topleft)
+        x1, y1 = self.screenToCell((rect.right - 1, rect.bottom - 1))
+        wx0, wy0, wx1, wy1 = self.window
+        box = (max(x0, wx0) - wx0, max(y0, wy0) - wy0, min(x1 + 1, wx1) - wx0, min(y1 + 1, wy1) - wy0)
+        if box[0] < box[2] and box[1] < box[3]:
+            self.dirtyBoxes.append(box)
+
+    def setOutlines(self, outlines):
+        """
+        Cell boxes (x0, y0, x1, y1) to outline over the cells, as (box, color) pairs.
+        """
+        self.outlines = [(self.cellsToRect(*box), tuple(color)) for box, color in outlines]
+
+    def _outlineEdges(self, rect):
+        width = min(outlineWidth, rect.width, rect.height)
+        edges = [pygame.Rect(rect.x, rect.y, rect.width, width), pygame.Rect(rect.x, rect.bottom - width, rect.width, width),
+                 pygame.Rect(rect.x, rect.y, width, rect.height), pygame.Rect(rect.right - width, rect.y, width, rect.height)]
+        return [edge for edge in (edge.clip(self.rect) for edge in edges) if edge]
+
+    def markAll(self):
+        self.fullRedraw = True
+
+    def forget(self, floor):
+        """
+        Drop what the canvas holds of a floor (e.g. when it is deleted).
+        """
+        if floor is self.shownFloor:
+            self.shownFloor = None
+        self.onionCache.pop(floor, None)
+
+    def draw(self, screen, floor, mode, neighbours=()):
+        """
+        Repaint whatever changed since the last call and return the dirty
+        screen rects (empty when nothing changed). `neighbours` are the
+        (floor, distance) pairs shown as onion skin, distance < 0 below.
+        """
+        if floor is not self.shownFloor or mode != self.shownMode or self.view != self.shownView:
+            if self.view != self.shownView:
+                with profiling.frameTimers.phase("gridLines"):
+                    self.gridOverlay = self._renderGridOverlay()
+            self.shownFloor = floor
+            self.shownMode = mode
+            self.shownView = self.view
+            self.markAll()
+        if neighbours or self.onionLayers:
+            self._updateOnion(neighbours)
+        outlinesMoved = self.outlines != self.shownOutlines
+        if outlinesMoved:
+            for rect, _color in self.shownOutlines:
+                for edge in self._outlineEdges(rect):
+                    self.markRect(edge)
+
+        if self.fullRedraw:
+            self.fullRedraw = False
+            self.dirtyBoxes = []
+            with profiling.frameTimers.phase("cellWindow"):
+                self._rebuildWindow(floor)
+            boxes = [(0, 0) + self.windowMask.shape]
+        else:
+            boxes, self.dirtyBoxes = self.dirtyBoxes, []
+            if len(boxes) > maxDirtyRects:
+                corners = np.array(boxes)
+                boxes = [tuple(corners[:, :2].min(axis=0).tolist() + corners[:, 2:].max(axis=0).tolist())]
+        if not boxes and not outlinesMoved:
+            return []
+
+        clip = screen.get_clip()
+        screen.set_clip(self.rect)
+        rects = [self._blitBox(screen, box) for box in boxes]
+        # outlines go back on top when they moved or the cells under them were repainted
+        if outlinesMoved or any(rect.collidelist(rects) >= 0 for rect, _color in self.outlines):
+            self.shownOutlines = self.outlines
+            for rect, color in self.outlines:
+                edges = self._outlineEdges(rect)
+                for edge in edges:
+                    screen.fill(color, edge)
+                rects += edges
+        screen.set_clip(clip)
+        return rects
+
+
+# -------------------------------- THUMBNAILS --------------------------------
+
+def floorThumbnail(floor, size):
+    """
+    A size×size preview of a whole floor: its painted extent shrunk to fit
+    (each pixel is the densest channel of the block of cells it covers),
+    walls brighter than floors.
+    """
+    _x0, _y0, mask = floor.toDense()
+    thumbnail = pygame.Surface((size, size), pygame.SRCALPHA)
+    thumbnail.fill(cellColor + (0,))
+    if not mask.size:
+        return thumbnail
+    factor = -(-max(mask.shape) // size)  # cells per thumbnail pixel
+    padded = np.zeros((-(-mask.shape[0] // factor) * factor, -(-mask.shape[1] // factor) * factor), dtype=np.uint8)
+    padded[:mask.shape[0], :mask.shape[1]] = mask
+    blocks = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor)
+    walls = ((blocks & layers.WALLS) != 0).mean(axis=(1, 3))
+    floors = ((blocks & layers.FLOOR) != 0).mean(axis=(1, 3))
+    alpha = np.maximum(walls * thumbnailWallAlpha, floors * thumbnailFloorAlpha)
+    x, y = (size - alpha.shape[0]) // 2, (size - alpha.shape[1]) // 2
+    alphaView = pygame.surfarray.pixels_alpha(thumbnail)
+    alphaView[x:x + alpha.shape[0], y:y + alpha.shape[1]] = np.minimum(255, alpha * 2).astype(np.uint8)
+    del alphaView
+    return thumbnail
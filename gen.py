@@ -19,28 +19,56 @@ Assumptions (as requested):
 Public entrypoint:
     createSchematic(floors)
 
-Where `floors` is a list like:
+Where `floors` is a list of layers.Floor objects (one bitmask grid per floor,
+see layers.py). Legacy dicts are still accepted and adapted on the fly:
     [
       { 'name': 'Floor 1', 'cells': { (x, y, 'floor'): True, (x, y, 'walls'): True, ... } },
       { 'name': 'Floor 2', 'cells': { ... } },
       ...
     ]
 
-We use tkinter's "Save As" dialog to choose the output file. The file is saved
-using mcschematic with Version.JE_1_20_1 when available (fallbacks included).
+We use tkinter's "Save As" dialog to choose the output file (unless a path is
+given, or when run headless via `python -m gen`, see main()). The file is written
+directly as a gzipped Sponge v2 schematic (DataVersion 3465, i.e. 1.20.1): the
+whole dungeon is built as one NumPy block-index volume plus a palette, and the
+BlockData varints are encoded in bulk, so no per-block Python calls are made.
+
+Exports are incremental: each floor's block slab is cached under a hash of its
+cells (plus its colour and wallHeight), and each floor's share of BlockData is
+cached in compressed form and spliced into the gzip stream, so re-exporting
+after an edit only rebuilds and recompresses the floors that changed (as long
+as the dungeon's bounding box and palette stay the same).
+
+Schematics can be read back with loadSchematic(): the gzip NBT is parsed as a
+stream (nbt.readFile), BlockData varints are decoded in bulk with NumPy, and
+the volume is cut back into floors along the same wallHeight + 2 stride.
+
+Output formats are pluggable (see EXPORTERS): buildVolume makes one dense
+block-index volume, and registered writers serialize that same buffer as a
+Sponge .schem, a Litematica .litematic, vanilla structure-block .nbt files
+(tiled to 48×48×48), or a .mcfunction of /fill commands, where the volume
+is merged into maximal axis-aligned boxes (volumeBoxes) so long wall runs and
+open rooms become one command each. Several formats can be written from one
+generation pass (createSchematic(formats=...), exportVolume).
 """
 
+import argparse
+import multiprocessing
 import os
-from typing import Dict, List, Tuple
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Callable, List, NamedTuple, Tuple, Union
 
-# Import save dialog locally to avoid forcing tkinter init when not exporting
-try:
-    from tkinter.filedialog import asksaveasfile
-except Exception:
-    asksaveasfile = None  # If tkinter isn't available, we'll fallback to a default path
+import numpy as np
 
-# mcschematic import (the package exposes MCSchematic and a Version enum)
-from mcschematic import MCSchematic, Version
+import layers
+import nbt
+import profiling
+import project
 
 
 # ----------------------------- CONFIG CONSTANTS -----------------------------
@@ -70,69 +98,583 @@ woolCycle = [
 # Matching concrete colors for walls
 concreteCycle = [c.replace("_wool", "_concrete") for c in woolCycle]
 
+# Every block the exporter can emit. Slabs and volumes store indices into this
+# table (0 = air); they are remapped to the compact file palette on save.
+blockTable = ["minecraft:air"] + woolCycle + concreteCycle
+
+spongeVersion = 2
+dataVersion = 3465  # Minecraft Java Edition 1.20.1
+
+maxFillVolume = 32768  # vanilla limit on blocks changed by a single /fill
+
+schemCompressLevel = 9
+# The fixed-size block records of structure files repeat almost byte for byte,
+# so higher levels only lengthen match searches (level 9 is ~18x slower than 6
+# here and no smaller). 6 is the gzip default, which vanilla writes too.
+structureCompressLevel = 6
+
+litematicVersion = 6
+litematicSubVersion = 1
+structureTileSize = 48  # vanilla structure blocks save and load at most 48×48×48
+
+# Re-export caches (see _floorSlab and _blockData)
+slabCacheBytes = 256 * 1024 * 1024
+
+# Slab generation fans out to worker processes only when at least this many
+# cells need rebuilding; below it, process round-trips cost more than they save
+parallelMinCells = 1 << 20
+exportWorkers = None  # worker processes (None: one per CPU)
+segmentCacheBytes = 64 * 1024 * 1024
+
+
 # ----------------------------- HELPER FUNCTIONS -----------------------------
 
-def _pickVersion():
+class ExportCancelled(Exception):
     """
-    Choose the best available Minecraft Java version constant for saving.
-    Prefers 1.20.1, falls back to sensible older enums if needed.
+    Raised inside an export when its cancel event is set.
     """
-    for name in ("JE_1_20_1", "JE_1_20", "JE_1_19_4", "JE_1_19", "JE_1_18"):
-        if hasattr(Version, name):
-            return getattr(Version, name)
-    # Absolute last resort: grab any attribute that isn't a dunder
-    for k, v in vars(Version).items():
-        if not k.startswith("_"):
-            return v
-    raise RuntimeError("No compatible Version enum found in mcschematic.Version")
 
 
-def _setBlock(schematic: MCSchematic, x: int, y: int, z: int, blockName: str):
+class Box(NamedTuple):
     """
-    Place a single block into the schematic at integer coordinates.
-    This wrapper exists for readability and potential future safety checks.
+    An axis-aligned box of one block, corners inclusive (like /fill).
     """
-    schematic.setBlock((x, y, z), blockName)
+    x0: int
+    y0: int
+    z0: int
+    x1: int
+    y1: int
+    z1: int
+    block: str
 
 
-def _exportSingleLayerPair(
-    schematic: MCSchematic,
-    layerIndex: int,
-    layerCells: Dict[Tuple[int, int, str], bool],
-    baseY: int,
-):
+class BlockVolume(NamedTuple):
+    """
+    A dense block volume ready to be serialized.
+
+    blocks  : uint8/uint16 array indexed [y, z, x] holding palette indices
+    palette : block names, palette[i] is the block for index i (palette[0] is air)
+    offset  : world (x, y, z) of blocks[0, 0, 0]
+    sources : optional (yStart, yEnd, key) per floor pair: blocks[yStart:yEnd]
+              depend only on `key`, so their encoded form can be cached
+    """
+    blocks: np.ndarray
+    palette: List[str]
+    offset: Tuple[int, int, int]
+    sources: Tuple[Tuple[int, int, tuple], ...] = None
+
+
+class _ByteBudgetCache:
+    """
+    LRU cache bounded by the total size (in bytes) of its values.
+    """
+
+    def __init__(self, budgetBytes: int):
+        self.budgetBytes = budgetBytes
+        self.entries = OrderedDict()  # key -> (value, nbytes)
+        self.usedBytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, nbytes: int):
+        with self.lock:
+            if key in self.entries:
+                self.usedBytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, nbytes)
+            self.usedBytes += nbytes
+            while self.usedBytes > self.budgetBytes and len(self.entries) > 1:
+                self.usedBytes -= self.entries.popitem(last=False)[1][1]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.usedBytes = 0
+
+
+_slabCache = _ByteBudgetCache(slabCacheBytes)        # _slabKey -> (originX, originZ, slab)
+_segmentCache = _ByteBudgetCache(segmentCacheBytes)  # segment key -> nbt.Deflated
+
+
+def clearExportCache():
+    """
+    Forget every cached floor slab and compressed BlockData segment.
     """
-    Export one floor+walls pair into the schematic at the given baseY.
+    _slabCache.clear()
+    _segmentCache.clear()
+
+
+def _floorBlockId(layerIndex: int) -> int:
+    return 1 + layerIndex % len(woolCycle)
+
+
+def _wallBlockId(layerIndex: int) -> int:
+    return 1 + len(woolCycle) + layerIndex % len(concreteCycle)
+
+
+def _exportSingleLayerPair(layerIndex: int, floor: layers.Floor):
+    """
+    Build the block slab of one floor+walls pair.
     Floors use wool, walls use concrete of the same color.
+
+    Returns (originX, originZ, slab) where slab is a uint8 array of blockTable
+    indices shaped [wallHeight + 2, z, x]:
+        slab[0]                    floor
+        slab[1 .. wallHeight]      walls extruded above the floor
+        slab[wallHeight + 1]       ceiling (same as floor)
     """
-    floorBlock = woolCycle[layerIndex % len(woolCycle)]
-    wallBlock  = concreteCycle[layerIndex % len(concreteCycle)]
+    originX, originZ, mask = floor.toDense()
+    floorCells = ((mask & layers.FLOOR) != 0).T  # [x, y] grid -> [z, x] plane
+    wallCells = ((mask & layers.WALLS) != 0).T
 
-    # 1) Place the floor at baseY
-    for (x, z, cellType), filled in layerCells.items():
-        if not filled:
-            continue
-        if cellType == "floor":
-            _setBlock(schematic, x, baseY, z, floorBlock)
+    slab = np.zeros((wallHeight + 2,) + floorCells.shape, dtype=np.uint8)
+    floorId = _floorBlockId(layerIndex)
+    slab[0][floorCells] = floorId
+    slab[1:wallHeight + 1][:, wallCells] = _wallBlockId(layerIndex)
+    slab[wallHeight + 1][floorCells] = floorId
+    return originX, originZ, slab
+
+
+def _slabKey(layerIndex: int, floor: layers.Floor) -> tuple:
+    """
+    Slab cache key: the floor's content hash, the blocks its index maps to
+    (woolCycle/concreteCycle) and wallHeight, so an unchanged floor at the same
+    colour is never rebuilt.
+    """
+    return (floor.contentHash(), _floorBlockId(layerIndex), _wallBlockId(layerIndex), wallHeight)
+
+
+def _slabJob(layerIndex: int, floor: layers.Floor, height: int):
+    """
+    Worker-process entry point: one floor's slab plus the seconds it took.
+    """
+    global wallHeight
+    start = time.perf_counter()
+    wallHeight = height  # spawned workers start from the module default
+    originX, originZ, slab = _exportSingleLayerPair(layerIndex, floor)
+    return originX, originZ, slab, time.perf_counter() - start
+
+
+def _processContext():
+    """
+    multiprocessing context for slab workers, or None to stay serial.
+
+    Workers are only started from the main thread, and only when the caller
+    opted in with `parallel` (the CLI's --parallel, procgen's --schem): spawn
+    and forkserver workers re-import the __main__ module, so the calling
+    script needs a __main__ guard, which the editor (main.py) does not have.
+    forkserver is preferred so no worker is forked from a threaded process.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return None
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
+
+
+_slabPool = None
+
+
+def _getSlabPool():
+    """
+    The shared slab worker pool (started on first use and kept for later
+    exports), or None when slabs must be built serially.
+    """
+    global _slabPool
+    workers = exportWorkers or os.cpu_count() or 1
+    if _slabPool is None and workers > 1:
+        context = _processContext()
+        if context is not None:
+            _slabPool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    return _slabPool
+
+
+def _buildSlabs(pending, slabs, parallel: bool, onSlab, cancelEvent):
+    """
+    Build the slabs of `pending` [(layerIndex, key, floor)] into `slabs`,
+    caching each one and calling onSlab() as it lands. Uses the worker pool
+    when allowed and the job is big enough to pay for shipping floors to other
+    processes; otherwise builds them in order on this thread.
+    """
+    cells = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in (floor.bounds() for _idx, _key, floor in pending))
+    pool = _getSlabPool() if parallel and len(pending) > 1 and cells >= parallelMinCells else None
+
+    def store(idx, key, originX, originZ, slab):
+        slab.flags.writeable = False  # shared through the cache
+        _slabCache.put(key, (originX, originZ, slab), slab.nbytes)
+        slabs[idx] = (key, originX, originZ, slab)
+        onSlab()
+
+    if pool is None:
+        for idx, key, floor in pending:
+            if cancelEvent is not None and cancelEvent.is_set():
+                raise ExportCancelled()
+            with profiling.exportTimers.phase(f"floor {idx + 1}"):
+                originX, originZ, slab = _exportSingleLayerPair(idx, floor)
+            store(idx, key, originX, originZ, slab)
+        return
+
+    futures = {pool.submit(_slabJob, idx, floor, wallHeight): (idx, key) for idx, key, floor in pending}
+    try:
+        for future in as_completed(futures):
+            if cancelEvent is not None and cancelEvent.is_set():
+                raise ExportCancelled()
+            idx, key = futures[future]
+            originX, originZ, slab, seconds = future.result()
+            profiling.exportTimers.add(f"floor {idx + 1}", seconds)
+            store(idx, key, originX, originZ, slab)
+    finally:
+        for future in futures:
+            future.cancel()
 
-    # 2) Extrude walls for wallHeight above the floor
-    for (x, z, cellType), filled in layerCells.items():
-        if not filled:
+
+def buildVolume(
+    floors: List[Union[layers.Floor, dict]],
+    progress: Callable[[int, int], None] = None,
+    cancelEvent: threading.Event = None,
+    parallel: bool = False,
+) -> BlockVolume:
+    """
+    Stack every floor pair along +Y (index 0 = bottommost, y = 0) into a single
+    dense volume, cropped to the placed blocks like a Sponge schematic expects.
+
+    The palette lists blocks in the order they are first placed (air first),
+    floor block before wall block within each pair.
+
+    progress(done, total) is called after each floor; setting cancelEvent
+    aborts with ExportCancelled at the next floor boundary.
+
+    Floor slabs come from a cache (see _slabKey), so re-exporting after an
+    edit only rebuilds the floors that changed. With `parallel` (opt-in;
+    the calling script needs a __main__ guard, see _processContext), large
+    rebuilds called from the main thread are spread over worker processes.
+    """
+    floors = layers.toFloors(floors)
+    slabs = [None] * len(floors)
+    done = [0]
+
+    def onSlab():
+        done[0] += 1
+        if progress is not None:
+            progress(done[0], len(floors))
+
+    pending = []
+    for idx, floor in enumerate(floors):
+        if cancelEvent is not None and cancelEvent.is_set():
+            raise ExportCancelled()
+        key = _slabKey(idx, floor)
+        cached = _slabCache.get(key)
+        if cached is None:
+            pending.append((idx, key, floor))
+        else:
+            slabs[idx] = (key,) + cached
+            onSlab()
+    _buildSlabs(pending, slabs, parallel, onSlab, cancelEvent)
+
+    with profiling.exportTimers.phase("stack"):
+        return _stackSlabs(slabs)
+
+
+def _stackSlabs(slabs: List[Tuple[tuple, int, int, np.ndarray]]) -> BlockVolume:
+    """
+    The second half of buildVolume: place per-floor slabs into one cropped
+    volume and build its palette.
+    """
+    pairHeight = wallHeight + 2
+
+    # Horizontal extent covering every non-empty floor's chunks
+    placed = [(x, z, s) for _key, x, z, s in slabs if s.size]
+    if placed:
+        minX = min(x for x, _z, _s in placed)
+        minZ = min(z for _x, z, _s in placed)
+        maxX = max(x + s.shape[2] for x, _z, s in placed)
+        maxZ = max(z + s.shape[1] for _x, z, s in placed)
+    else:
+        minX = minZ = maxX = maxZ = 0
+
+    volume = np.zeros((pairHeight * len(slabs), maxZ - minZ, maxX - minX), dtype=np.uint8)
+    for idx, (_key, x, z, slab) in enumerate(slabs):
+        if not slab.size:
             continue
-        if cellType == "walls":
-            for dy in range(1, wallHeight + 1):
-                _setBlock(schematic, x, baseY + dy, z, wallBlock)
-
-    # 3) Ceiling (same as floor) at y = baseY + wallHeight + 1
-    ceilingY = baseY + wallHeight + 1
-    for (x, z, cellType), filled in layerCells.items():
-        if not filled:
+        baseY = idx * pairHeight
+        volume[baseY:baseY + pairHeight, z - minZ:z - minZ + slab.shape[1], x - minX:x - minX + slab.shape[2]] = slab
+
+    # Crop to the bounding box of non-air blocks
+    filled = volume != 0
+    if not filled.any():
+        return BlockVolume(np.zeros((1, 1, 1), dtype=np.uint8), [blockTable[0]], (0, 0, 0))
+    bounds = []
+    for axis in range(3):
+        present = np.flatnonzero(filled.any(axis=tuple(a for a in range(3) if a != axis)))
+        bounds.append((int(present[0]), int(present[-1]) + 1))
+    (y0, y1), (z0, z1), (x0, x1) = bounds
+    volume = volume[y0:y1, z0:z1, x0:x1]
+
+    # Palette in first-placement order, then remap table ids -> palette ids
+    used = np.zeros(len(blockTable), dtype=bool)
+    paletteIds = [0]
+    for idx, (_key, _x, _z, slab) in enumerate(slabs):
+        for blockId in (_floorBlockId(idx), _wallBlockId(idx)):
+            if not used[blockId] and (slab == blockId).any():
+                used[blockId] = True
+                paletteIds.append(blockId)
+    remap = np.zeros(len(blockTable), dtype=np.uint8)
+    remap[paletteIds] = np.arange(len(paletteIds), dtype=np.uint8)
+
+    # Rows of each floor pair inside the crop; their content depends only on
+    # the slab, the crop window and the two palette ids the pair maps to
+    sources = []
+    for idx, (key, _x, _z, _slab) in enumerate(slabs):
+        baseY = idx * pairHeight
+        rowStart, rowEnd = max(baseY, y0), min(baseY + pairHeight, y1)
+        if rowStart < rowEnd:
+            segmentKey = (key, rowStart - baseY, rowEnd - baseY, minX + x0, minZ + z0, x1 - x0, z1 - z0,
+                          int(remap[_floorBlockId(idx)]), int(remap[_wallBlockId(idx)]))
+            sources.append((rowStart - y0, rowEnd - y0, segmentKey))
+
+    palette = [blockTable[blockId] for blockId in paletteIds]
+    return BlockVolume(remap[volume], palette, (minX + x0, y0, minZ + z0), tuple(sources))
+
+
+def _encodeVarints(values: np.ndarray) -> bytes:
+    """
+    Encode a flat array of non-negative ints as concatenated LEB128 varints.
+    When every value fits in 7 bits (the usual case) this is a plain cast.
+    """
+    values = np.ascontiguousarray(values).ravel()
+    if values.size == 0 or int(values.max()) < 0x80:
+        return values.astype(np.uint8).tobytes()
+
+    values = values.astype(np.uint32)
+    lengths = np.ones(values.size, dtype=np.int64)
+    for shift in (7, 14, 21, 28):
+        lengths += values >= (1 << shift)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max())):
+        sel = lengths > k
+        chunk = (values[sel] >> (7 * k)) & 0x7F
+        more = (lengths[sel] > k + 1).astype(np.uint32) << 7
+        out[starts[sel] + k] = chunk | more
+    return out.tobytes()
+
+
+def _decodeVarints(data: bytes, count: int = None) -> np.ndarray:
+    """
+    Decode concatenated LEB128 varints (the inverse of _encodeVarints) into
+    a flat array, in bulk: each byte's position inside its varint comes from
+    the positions of the terminating bytes, and the 7-bit groups are summed
+    per varint with one np.add.reduceat. When no byte has its continuation
+    bit set (the usual case) this is a plain cast.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    more = raw >= 0x80
+    if not more.any():
+        values = raw
+    else:
+        ends = np.flatnonzero(~more)
+        if not ends.size or ends[-1] != raw.size - 1:
+            raise ValueError("BlockData ends in the middle of a varint")
+        starts = np.r_[0, ends[:-1] + 1]
+        position = np.arange(raw.size) - np.repeat(starts, ends - starts + 1)
+        if int(position.max()) > 4:
+            raise ValueError("BlockData holds a varint longer than 5 bytes")
+        groups = (raw & 0x7F).astype(np.uint32) << (7 * position).astype(np.uint32)
+        values = np.add.reduceat(groups, starts)
+    if count is not None and values.size != count:
+        raise ValueError(f"BlockData holds {values.size} blocks, expected {count}")
+    return values
+
+
+def _blockData(volume: BlockVolume):
+    """
+    BlockData of a volume: with `sources`, one separately deflated segment
+    per floor pair, reused from the segment cache when that pair's rows are
+    unchanged (missing ones are compressed on a thread pool when there is
+    enough of them); otherwise the plain varint bytes.
+    """
+    if volume.sources is None:
+        return _encodeVarints(volume.blocks)
+    cacheKeys = [key + (schemCompressLevel,) for _yStart, _yEnd, key in volume.sources]
+    pieces = [_segmentCache.get(cacheKey) for cacheKey in cacheKeys]
+    missing = [idx for idx, piece in enumerate(pieces) if piece is None]
+
+    def deflate(idx):
+        yStart, yEnd, _key = volume.sources[idx]
+        return nbt.deflateSegment(_encodeVarints(volume.blocks[yStart:yEnd]), schemCompressLevel)
+
+    # zlib releases the GIL while compressing, so threads are enough here
+    workers = min(len(missing), exportWorkers or os.cpu_count() or 1)
+    if workers > 1 and sum(volume.blocks[0].size for _idx in missing) * (wallHeight + 2) >= parallelMinCells:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="schem-deflate") as pool:
+            deflated = list(pool.map(deflate, missing))
+    else:
+        deflated = [deflate(idx) for idx in missing]
+    for idx, piece in zip(missing, deflated):
+        _segmentCache.put(cacheKeys[idx], piece, len(piece.data))
+        pieces[idx] = piece
+    return nbt.Segments(pieces)
+
+
+def saveSchem(volume: BlockVolume, path: str):
+    """
+    Write a BlockVolume as a gzipped Sponge v2 .schem file.
+    """
+    height, length, width = volume.blocks.shape
+    offsetX, offsetY, offsetZ = volume.offset
+    nbt.writeFile(path, "Schematic", {
+        "Version": nbt.Int(spongeVersion),
+        "DataVersion": nbt.Int(dataVersion),
+        "Metadata": {
+            "WEOffsetX": nbt.Int(offsetX),
+            "WEOffsetY": nbt.Int(offsetY),
+            "WEOffsetZ": nbt.Int(offsetZ),
+        },
+        "Height": nbt.Short(height),
+        "Length": nbt.Short(length),
+        "Width": nbt.Short(width),
+        "PaletteMax": nbt.Int(len(volume.palette)),
+        "Palette": {name: nbt.Int(idx) for idx, name in enumerate(volume.palette)},
+        "BlockData": _blockData(volume),
+        "BlockEntities": nbt.List(elementId=nbt.TAG_COMPOUND),
+    }, compresslevel=schemCompressLevel)
+
+
+def readSchem(path: str) -> BlockVolume:
+    """
+    Read a Sponge .schem file (v2, or v3 with its nested Blocks compound)
+    into a BlockVolume; the inverse of saveSchem. Any damaged or
+    incomplete file raises ValueError.
+    """
+    try:
+        _rootName, root = nbt.readFile(path)
+        if set(root) == {"Schematic"}:
+            root = root["Schematic"]  # v3 wraps everything in one compound
+        if "Blocks" in root:
+            palette, data = root["Blocks"]["Palette"], root["Blocks"].get("Data", b"")
+        else:
+            palette, data = root["Palette"], root.get("BlockData", b"")
+
+        # Dimensions are unsigned shorts stored in signed tags
+        width, height, length = (int(root[name]) & 0xFFFF for name in ("Width", "Height", "Length"))
+        metadata = root.get("Metadata", {})
+        offset = tuple(int(metadata.get(name, 0)) for name in ("WEOffsetX", "WEOffsetY", "WEOffsetZ"))
+
+        names = ["minecraft:air"] * (max(palette.values(), default=0) + 1)
+        for name, idx in palette.items():
+            names[int(idx)] = name
+        blocks = _decodeVarints(data, width * height * length).reshape(height, length, width)
+        if blocks.size and int(blocks.max()) >= len(names):
+            raise ValueError("BlockData refers to a block missing from the palette")
+        if len(names) <= 0x100:
+            blocks = blocks.astype(np.uint8)
+    except (OSError, EOFError, KeyError, IndexError, TypeError, AttributeError, struct.error, zlib.error) as error:
+        # a truncated gzip stream, a cut-off tag or a missing/mistyped tag all mean the same to callers
+        raise ValueError(f"not a readable schematic: {error!r}") from error
+    return BlockVolume(blocks, names, offset)
+
+
+def _isAir(blockName: str) -> bool:
+    return blockName.split("[", 1)[0] in ("minecraft:air", "minecraft:cave_air", "minecraft:void_air")
+
+
+def meshBoxes(cells: np.ndarray) -> np.ndarray:
+    """
+    Greedy-mesh a boolean [z, x] plane into axis-aligned rectangles.
+
+    Each row is split into runs of filled cells (vectorized), then runs with
+    the same x-span on consecutive rows are merged into one rectangle.
+    Returns an int array of shape (N, 4): x0, z0, x1, z1 with exclusive ends.
+    """
+    cells = np.asarray(cells, dtype=bool)
+    if not cells.any():
+        return np.zeros((0, 4), dtype=np.int64)
+
+    # Runs per row: +1 edges are run starts, -1 edges run ends
+    padded = np.zeros((cells.shape[0], cells.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = cells
+    edges = np.diff(padded, axis=1)
+    startRows, startCols = np.nonzero(edges == 1)
+    _endRows, endCols = np.nonzero(edges == -1)  # same row order as starts
+
+    # Grow rectangles downwards while the exact same span repeats on the next row
+    boxes = []
+    active = {}  # (x0, x1) -> first row of a rectangle still being grown
+    previousRow = None
+    rowBreaks = np.flatnonzero(np.diff(startRows)) + 1
+    rowIndices = startRows[np.concatenate(([0], rowBreaks))].tolist()
+    for row, rowStarts, rowEnds in zip(rowIndices, np.split(startCols, rowBreaks), np.split(endCols, rowBreaks)):
+        spans = set(zip(rowStarts.tolist(), rowEnds.tolist()))
+        for span in list(active):
+            if row != previousRow + 1 or span not in spans:
+                boxes.append((span[0], active.pop(span), span[1], previousRow + 1))
+        for span in spans:
+            active.setdefault(span, row)
+        previousRow = row
+    for span, firstRow in active.items():
+        boxes.append((span[0], firstRow, span[1], previousRow + 1))
+    return np.array(boxes, dtype=np.int64).reshape(-1, 4)
+
+
+def volumeBoxes(volume: BlockVolume) -> List[Box]:
+    """
+    The non-air blocks of a volume as merged boxes: each row (y) is meshed
+    per block with meshBoxes, and a row identical to the one below extends
+    that row's boxes upwards instead, so a wall column is still one box.
+    """
+    offsetX, offsetY, offsetZ = volume.offset
+    boxes = []
+    openBoxes = []  # boxes of the current run of identical rows, as lists so y1 can grow
+    previous = None
+    for y in range(volume.blocks.shape[0]):
+        row = volume.blocks[y]
+        if previous is not None and np.array_equal(row, previous):
+            for box in openBoxes:
+                box[4] = offsetY + y
             continue
-        if cellType == "floor":
-            _setBlock(schematic, x, ceilingY, z, floorBlock)
+        boxes.extend(Box(*box) for box in openBoxes)
+        openBoxes = []
+        for blockId in np.flatnonzero(np.bincount(row.ravel(), minlength=1)[1:]) + 1:
+            block = volume.palette[blockId]
+            for x0, z0, x1, z1 in meshBoxes(row == blockId).tolist():
+                openBoxes.append([offsetX + x0, offsetY + y, offsetZ + z0, offsetX + x1 - 1, offsetY + y, offsetZ + z1 - 1, block])
+        previous = row
+    boxes.extend(Box(*box) for box in openBoxes)
+    return boxes
+
+
+def _splitFillBox(box: Box) -> List[Box]:
+    """
+    Split a box into pieces that each stay within maxFillVolume blocks,
+    halving along the longest axis.
+    """
+    sizes = (box.x1 - box.x0 + 1, box.y1 - box.y0 + 1, box.z1 - box.z0 + 1)
+    if sizes[0] * sizes[1] * sizes[2] <= maxFillVolume:
+        return [box]
+    axis = sizes.index(max(sizes))
+    low = list(box[:6])
+    high = list(box[:6])
+    middle = box[axis] + sizes[axis] // 2
+    low[axis + 3] = middle - 1
+    high[axis] = middle
+    return _splitFillBox(Box(*low, box.block)) + _splitFillBox(Box(*high, box.block))
 
-    return ceilingY + 1
 
+def saveMcfunction(boxes: List[Box], path: str):
+    """
+    Write boxes as a .mcfunction of /fill commands, relative (~) to the
+    position the function is run from.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for box in boxes:
+            for piece in _splitFillBox(box):
+                x0, y0, z0, x1, y1, z1, block = piece
+                f.write(f"fill ~{x0} ~{y0} ~{z0} ~{x1} ~{y1} ~{z1} {block}\n")
 
 
 def _splitPath(path: str):
@@ -147,38 +689,19 @@ def _splitPath(path: str):
     return directory, name
 
 
-# ------------------------------- PUBLIC API --------------------------------
-
-def createSchematic(floors: List[dict]):
+def askSavePath(saveDir: str = "exports", saveName: str = "dungeon") -> str:
     """
-    Build and save a .schem file from the provided floors list.
-
-    Parameters
-    ----------
-    floors : List[dict]
-        Each item must be a dict with:
-          - 'name': str
-          - 'cells': dict with keys of (x: int, y: int, type: 'floor'|'walls') and truthy values.
-
-    Behavior
-    --------
-    Floors are exported in list order (index 0 = bottommost).
-    For each pair we place floor, walls (up to wallHeight), and ceiling.
-    Each pair uses a distinct wool color cycling through 16 variants.
+    Ask for an output path with tkinter's Save As dialog, in any registered
+    format (.schem by default). Falls back to a timestamped .schem in saveDir
+    if tkinter is unavailable or the user cancels.
     """
-    # Create schematic container
-    schematic = MCSchematic()
-
-    # Stack layers along +Y starting at y = 0
-    baseY = 0
-    for idx, layer in enumerate(floors):
-        layerCells = layer.get("cells", {})
-        baseY = _exportSingleLayerPair(schematic, idx, layerCells, baseY)
-
-    # Choose output path
-    saveDir = "exports"
     os.makedirs(saveDir, exist_ok=True)
-    saveName = "dungeon"  # default name if no dialog is available or user cancels
+
+    # Import save dialog locally so headless exports never initialize tkinter
+    try:
+        from tkinter.filedialog import asksaveasfile
+    except Exception:
+        asksaveasfile = None  # If tkinter isn't available, we'll fallback to a default path
 
     # Try Save As dialog if available
     chosenPath = None
@@ -186,7 +709,7 @@ def createSchematic(floors: List[dict]):
         try:
             fobj = asksaveasfile(
                 defaultextension=".schem",
-                filetypes=[("Minecraft Schematic", "*.schem")],
+                filetypes=[(exporter.description, f"*.{extension}") for extension, exporter in exporters.items()],
                 initialdir=saveDir,
                 initialfile=saveName + ".schem",
                 title="Save Schematic As"
@@ -202,16 +725,439 @@ def createSchematic(floors: List[dict]):
             # If tkinter fails for any reason, we silently fall back to defaults
             chosenPath = None
 
+    extension = "schem"
     if chosenPath is None:
         # Fallback to a timestamped filename in ./exports
-        import time as _time
-        saveName = f"{saveName}_{int(_time.time())}"
+        saveName = f"{saveName}_{int(time.time())}"
         directory, nameOnly = saveDir, saveName
     else:
         directory, nameOnly = _splitPath(chosenPath)
+        if os.path.splitext(chosenPath)[1].lstrip(".") in exporters:
+            extension = os.path.splitext(chosenPath)[1].lstrip(".")
+    return os.path.join(directory, f"{nameOnly}.{extension}")
+
+
+def _exportProjectFile(projectPath: str, outputPaths: List[str], parallel: bool = False):
+    """
+    Worker for the batch CLI: load one project file, build its volume once
+    and write it to every output path (format picked by extension).
+    Returns (projectPath, paths written, seconds, blockCount).
+    """
+    start = time.perf_counter()
+    floors = project.load(projectPath)
+    volume = buildVolume(floors, parallel=parallel)
+    written = exportVolume(volume, outputPaths)
+    return projectPath, written, time.perf_counter() - start, int(np.count_nonzero(volume.blocks))
+
+
+def _collectProjects(inputs: List[str]) -> List[str]:
+    """
+    Expand directories into the project files they contain (sorted).
+    """
+    projects = []
+    for path in inputs:
+        if os.path.isdir(path):
+            projects.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.endswith(project.projectExtension)
+            ))
+        else:
+            projects.append(path)
+    return projects
+
+
+# -------------------------------- EXPORTERS ---------------------------------
+#
+# Every output format is a writer of the same intermediate BlockVolume, so one
+# generation pass (buildVolume) can be serialized to several formats. Writers
+# are registered under their file extension and return the paths they wrote.
+
+class Exporter(NamedTuple):
+    description: str
+    write: Callable[[BlockVolume, str], List[str]]
+
+
+exporters = {}  # file extension (without the dot) -> Exporter
+
+
+def registerExporter(extension: str, description: str, write: Callable[[BlockVolume, str], List[str]]):
+    """
+    Make a BlockVolume writer available to createSchematic, exportVolume and
+    the CLI for files ending in .<extension>.
+    """
+    exporters[extension.lstrip(".")] = Exporter(description, write)
+
+
+def _writeSchem(volume: BlockVolume, path: str) -> List[str]:
+    saveSchem(volume, path)
+    return [path]
+
+
+def _writeMcfunction(volume: BlockVolume, path: str) -> List[str]:
+    saveMcfunction(volumeBoxes(volume), path)
+    return [path]
+
+
+def _packBits(values: np.ndarray, bits: int) -> np.ndarray:
+    """
+    Pack values of `bits` bits each into one little-endian bit stream of
+    64-bit words, values straddling word boundaries (Litematica's bit array
+    layout). Done in slices of a multiple of 64 values, which always end on
+    a word boundary, to bound the temporary bit array.
+    """
+    values = np.ascontiguousarray(values).ravel()
+    packed = np.zeros(-(-values.size * bits // 64) * 8, dtype=np.uint8)
+    shifts = np.arange(bits, dtype=np.uint16)
+    step = 64 * 16384
+    for start in range(0, values.size, step):
+        chunk = values[start:start + step].astype(np.uint16)
+        chunkBytes = np.packbits(((chunk[:, None] >> shifts) & 1).astype(np.uint8).ravel(), bitorder="little")
+        offset = start * bits // 8
+        packed[offset:offset + chunkBytes.size] = chunkBytes
+    return packed.view("<i8")
+
+
+def saveLitematic(volume: BlockVolume, path: str, name: str = None) -> List[str]:
+    """
+    Write a BlockVolume as a Litematica schematic (.litematic, format 6) with
+    one region.
+    """
+    height, length, width = volume.blocks.shape
+    name = name or _splitPath(path)[1]
+    now = nbt.Long(int(time.time() * 1000))
+    size = {"x": nbt.Int(width), "y": nbt.Int(height), "z": nbt.Int(length)}
+    bits = max(2, (len(volume.palette) - 1).bit_length())
+    nbt.writeFile(path, "", {
+        "MinecraftDataVersion": nbt.Int(dataVersion),
+        "Version": nbt.Int(litematicVersion),
+        "SubVersion": nbt.Int(litematicSubVersion),
+        "Metadata": {
+            "Name": name,
+            "Author": "Dungeon Designer",
+            "Description": "",
+            "RegionCount": nbt.Int(1),
+            "TotalBlocks": nbt.Int(int(np.count_nonzero(volume.blocks))),
+            "TotalVolume": nbt.Int(volume.blocks.size),
+            "EnclosingSize": dict(size),
+            "TimeCreated": now,
+            "TimeModified": now,
+        },
+        "Regions": {
+            name: {
+                "Position": {"x": nbt.Int(0), "y": nbt.Int(0), "z": nbt.Int(0)},
+                "Size": dict(size),
+                "BlockStatePalette": nbt.List([{"Name": block} for block in volume.palette]),
+                # indexed (y * length + z) * width + x, the order of blocks[y, z, x]
+                "BlockStates": nbt.LongArray(_packBits(volume.blocks, bits)),
+                "Entities": nbt.List(elementId=nbt.TAG_COMPOUND),
+                "TileEntities": nbt.List(elementId=nbt.TAG_COMPOUND),
+                "PendingBlockTicks": nbt.List(elementId=nbt.TAG_COMPOUND),
+                "PendingFluidTicks": nbt.List(elementId=nbt.TAG_COMPOUND),
+            }
+        },
+    }, compresslevel=schemCompressLevel)
+    return [path]
+
+
+# One entry of a structure's "blocks" list, {pos: [x, y, z], state: n}, as raw NBT
+_structureBlockRecord = np.dtype([
+    ("posTag", "u1"), ("posNameLength", ">u2"), ("posName", "S3"),
+    ("posElementTag", "u1"), ("posCount", ">i4"), ("pos", ">i4", 3),
+    ("stateTag", "u1"), ("stateNameLength", ">u2"), ("stateName", "S5"), ("state", ">i4"),
+    ("end", "u1"),
+])
+
+
+def _saveStructureTile(tile: np.ndarray, palette: List[str], path: str):
+    height, length, width = tile.shape
+    usedIds = np.flatnonzero(np.bincount(tile.ravel(), minlength=len(palette)))
+    remap = np.zeros(len(palette), dtype=np.int32)
+    remap[usedIds] = np.arange(len(usedIds), dtype=np.int32)
+
+    ys, zs, xs = np.indices(tile.shape).reshape(3, -1)
+    records = np.zeros(tile.size, dtype=_structureBlockRecord)
+    records["posTag"], records["posNameLength"], records["posName"] = nbt.TAG_LIST, 3, b"pos"
+    records["posElementTag"], records["posCount"] = nbt.TAG_INT, 3
+    records["pos"] = np.stack((xs, ys, zs), axis=1)
+    records["stateTag"], records["stateNameLength"], records["stateName"] = nbt.TAG_INT, 5, b"state"
+    records["state"] = remap[tile.ravel()]
+
+    nbt.writeFile(path, "", {
+        "DataVersion": nbt.Int(dataVersion),
+        "size": nbt.List([nbt.Int(width), nbt.Int(height), nbt.Int(length)]),
+        "palette": nbt.List([{"Name": palette[blockId]} for blockId in usedIds.tolist()]),
+        "blocks": nbt.RawList(nbt.TAG_COMPOUND, len(records), records.tobytes()),
+        "entities": nbt.List(elementId=nbt.TAG_COMPOUND),
+    }, compresslevel=structureCompressLevel)
+
+
+def saveStructure(volume: BlockVolume, path: str) -> List[str]:
+    """
+    Write a BlockVolume as vanilla structure-block files (.nbt). Volumes
+    larger than structureTileSize on any axis are cut into tiles written as
+    <name>_<x>_<y>_<z>.nbt (tile indices; tile (i, j, k) goes
+    structureTileSize * (i, j, k) blocks from the first). Air is stored, so
+    loading a tile clears what was there, like pasting the .schem.
+    """
+    height, length, width = volume.blocks.shape
+    size = structureTileSize
+    if max(height, length, width) <= size:
+        _saveStructureTile(volume.blocks, volume.palette, path)
+        return [path]
+    directory, name = _splitPath(path)
+    paths = []
+    for tileX in range(-(-width // size)):
+        for tileY in range(-(-height // size)):
+            for tileZ in range(-(-length // size)):
+                tile = volume.blocks[tileY * size:(tileY + 1) * size, tileZ * size:(tileZ + 1) * size, tileX * size:(tileX + 1) * size]
+                tilePath = os.path.join(directory, f"{name}_{tileX}_{tileY}_{tileZ}.nbt")
+                _saveStructureTile(tile, volume.palette, tilePath)
+                paths.append(tilePath)
+    return paths
+
+
+registerExporter("schem", "Sponge schematic", _writeSchem)
+registerExporter("litematic", "Litematica schematic", saveLitematic)
+registerExporter("nbt", "Structure block file", saveStructure)
+registerExporter("mcfunction", "Function of /fill commands", _writeMcfunction)
 
-    # Save schematic with a 1.20.1-compatible version (with fallbacks)
-    versionEnum = _pickVersion()
-    schematic.save(directory, nameOnly, versionEnum)
+
+def exportVolume(volume: BlockVolume, paths: List[str]) -> List[str]:
+    """
+    Serialize one BlockVolume to every path, each with the exporter of its
+    extension. Returns the paths written (tiled formats write several).
+    """
+    written = []
+    for path in paths:
+        extension = os.path.splitext(path)[1].lstrip(".")
+        exporter = exporters.get(extension)
+        if exporter is None:
+            raise ValueError(f"no exporter for .{extension} files (known: {', '.join(sorted(exporters))})")
+        with profiling.exportTimers.phase(f"write {extension}"):
+            written.extend(exporter.write(volume, path))
+    return written
+
+
+# ------------------------------- PUBLIC API --------------------------------
+
+def createSchematic(
+    floors: List[Union[layers.Floor, dict]],
+    path: str = None,
+    progress: Callable[[int, int], None] = None,
+    cancelEvent: threading.Event = None,
+    autoWalls: bool = False,
+    wallConnectivity: int = 8,
+    wallThickness: int = 1,
+    formats: List[str] = (),
+    parallel: bool = False,
+):
+    """
+    Build and save a .schem file (or any registered format) from the provided floors list.
+
+    Parameters
+    ----------
+    floors : List[layers.Floor | dict]
+        Each item is a layers.Floor, or a legacy dict with:
+          - 'name': str
+          - 'cells': dict with keys of (x: int, y: int, type: 'floor'|'walls') and truthy values.
+    path : str, optional
+        Output path; its extension picks the exporter (see `exporters`:
+        .schem, .litematic, .nbt, .mcfunction). If omitted, a Save As dialog
+        is shown.
+    progress : callable, optional
+        progress(done, total), called once per floor and once after saving
+        (so total = len(floors) + 1).
+    cancelEvent : threading.Event, optional
+        When set, the export stops with ExportCancelled before the next floor
+        (or before saving) and no file is written.
+    autoWalls : bool, optional
+        Add walls around every floor's footprint before exporting (see
+        layers.autoWalls); the floors passed in are not modified.
+    wallConnectivity : int, optional
+        4 or 8: whether diagonal neighbours of floor cells get walls too.
+    wallThickness : int, optional
+        Thickness of the added walls, in blocks.
+    formats : list of str, optional
+        Extra formats (extensions such as "litematic") written next to
+        `path` under the same name. All formats serialize the same block
+        volume, so the dungeon is generated once however many are written.
+    parallel : bool, optional
+        Build large sets of floors in worker processes (see buildVolume).
+        Only for scripts with a __main__ guard, called from the main thread.
+
+    Behavior
+    --------
+    Floors are exported in list order (index 0 = bottommost).
+    For each pair we place floor, walls (up to wallHeight), and ceiling.
+    Each pair uses a distinct wool color cycling through 16 variants.
+
+    Time spent per floor ("floor N"), stacking ("stack") and saving ("save",
+    split per format as "write <ext>") is recorded in profiling.exportTimers,
+    committed once per export. Returns `path`.
+    """
+    profiling.exportTimers.discard()  # partial timings of an export that was cancelled
+    total = len(floors) + 1
+    floorProgress = None if progress is None else (lambda done, _count: progress(done, total))
+    if autoWalls:
+        floors = [layers.autoWalls(floor, wallConnectivity, wallThickness) for floor in layers.toFloors(floors)]
+
+    # Stack layers along +Y starting at y = 0
+    volume = buildVolume(floors, floorProgress, cancelEvent, parallel)
+
+    # Choose output path
+    if path is None:
+        path = askSavePath()
+
+    if cancelEvent is not None and cancelEvent.is_set():
+        raise ExportCancelled()
+
+    # Serialize the one volume to every requested format
+    directory, name = _splitPath(path)
+    paths = [path] + [os.path.join(directory, f"{name}.{extension.lstrip('.')}") for extension in formats
+                      if extension.lstrip(".") != os.path.splitext(path)[1].lstrip(".")]
+    with profiling.exportTimers.phase("save"):
+        exportVolume(volume, paths)
+    profiling.exportTimers.commit()
+    if progress is not None:
+        progress(total, total)
     # Optionally return the actual path for UI feedback
-    return os.path.join(directory, f"{nameOnly}.schem")
+    return path
+
+
+def loadSchematic(path: str) -> List[layers.Floor]:
+    """
+    Read a .schem file back into floors (the inverse of createSchematic).
+
+    The volume is cut into floor pairs with the same wallHeight + 2 stride
+    the exporter uses, counted from world y = 0 (WEOffsetY locates the
+    cropped volume), and each pair is mapped back the way
+    _exportSingleLayerPair laid it out: a solid block in the floor or the
+    ceiling row sets FLOOR, one in any wall row sets WALLS. Wool and concrete
+    land where they were placed; other solid blocks (older exports built
+    walls from wool too) count for the row they are in. Floors below the
+    first non-empty pair come back empty, so colours and heights line up on
+    re-export. The whole volume is classified with one palette lookup and
+    every pair with a few array reductions.
+    """
+    volume = readSchem(path)
+    offsetX, offsetY, offsetZ = volume.offset
+    height, length, width = volume.blocks.shape
+    pairHeight = wallHeight + 2
+
+    solid = np.array([not _isAir(name) for name in volume.palette])
+    filled = solid[volume.blocks]
+
+    def rowsFilled(rowStart, rowEnd):
+        # [z, x] cells with a solid block in world rows [rowStart, rowEnd)
+        rowStart, rowEnd = max(rowStart - offsetY, 0), min(rowEnd - offsetY, height)
+        if rowStart >= rowEnd:
+            return np.zeros((length, width), dtype=bool)
+        return filled[rowStart:rowEnd].any(axis=0)
+
+    floors = []
+    firstPair, lastPair = min(offsetY // pairHeight, 0), (offsetY + height - 1) // pairHeight
+    for pairIndex in range(firstPair, lastPair + 1):
+        baseY = pairIndex * pairHeight
+        floorCells = rowsFilled(baseY, baseY + 1) | rowsFilled(baseY + wallHeight + 1, baseY + wallHeight + 2)
+        wallCells = rowsFilled(baseY + 1, baseY + wallHeight + 1)
+        mask = floorCells * np.uint8(layers.FLOOR) | wallCells * np.uint8(layers.WALLS)
+        floors.append(layers.Floor(f"Floor {len(floors) + 1}", mask=mask.T, origin=(offsetX, offsetZ)))  # [z, x] plane -> [x, y] grid
+    return floors
+
+
+class ExportJob:
+    """
+    Runs createSchematic on a worker thread so the editor keeps drawing.
+
+    The floors are snapshotted on construction (lazy floors stay lazy and are
+    decoded on the worker), so the user can keep editing while it runs.
+    Poll `progress` (0..1), `done`, `path` and `error` from the UI thread.
+    """
+
+    def __init__(self, floors: List[Union[layers.Floor, dict]], path: str, **options):
+        self.snapshot = [floor.copy() for floor in layers.toFloors(floors)]
+        self.path = path
+        self.options = options  # extra createSchematic keyword arguments (formats, autoWalls, ...)
+        self.progress = 0.0
+        self.error = None
+        self.cancelEvent = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="schematic-export", daemon=True)
+        self.thread.start()
+
+    def _onProgress(self, done: int, total: int):
+        self.progress = done / total
+
+    def _run(self):
+        try:
+            createSchematic(self.snapshot, self.path, self._onProgress, self.cancelEvent, **self.options)
+        except Exception as e:
+            self.error = e
+
+    @property
+    def done(self) -> bool:
+        return not self.thread.is_alive()
+
+    @property
+    def cancelled(self) -> bool:
+        return isinstance(self.error, ExportCancelled)
+
+    def cancel(self):
+        self.cancelEvent.set()
+
+
+def main(argv: List[str] = None):
+    """
+    Headless batch export: `python -m gen PROJECT_OR_DIR [...] [-o OUT] [-f FORMAT [FORMAT ...]]`.
+
+    Each project file is exported to <OUT>/<project name>.<FORMAT> for every
+    format (or straight to OUT when it is a file path and there is a single
+    input), in parallel across a process pool; a project's formats share one
+    generation pass. With --parallel, projects are exported one at a time
+    instead and each one's floors are spread over worker processes, which
+    suits a single large project. Never imports tkinter or pygame.
+    """
+    global exportWorkers
+    parser = argparse.ArgumentParser(prog="python -m gen", description="Export dungeon projects to .schem, .litematic, structure .nbt or .mcfunction files.")
+    parser.add_argument("inputs", nargs="+", help=f"project files ({project.projectExtension}) or directories of them")
+    parser.add_argument("-o", "--output", default="exports", help="output directory, or an output file path for a single input")
+    parser.add_argument("-f", "--format", nargs="+", choices=sorted(exporters), default=["schem"], help="output format(s) for directory outputs")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--parallel", action="store_true", help="build each project's floors in worker processes, one project at a time (for a single large project)")
+    args = parser.parse_args(argv)
+
+    projects = _collectProjects(args.inputs)
+    if not projects:
+        parser.error("no project files found")
+
+    if os.path.splitext(args.output)[1].lstrip(".") in exporters:
+        if len(projects) != 1:
+            parser.error("an output file path needs exactly one input project")
+        outputs = [[args.output]]
+    else:
+        outputs = [[os.path.join(args.output, f"{_splitPath(projectPath)[1]}.{extension}") for extension in args.format]
+                   for projectPath in projects]
+    for projectOutputs in outputs:
+        for output in projectOutputs:
+            os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    start = time.perf_counter()
+    totalBlocks = 0
+
+    def report(results):
+        nonlocal totalBlocks
+        for projectPath, written, seconds, blockCount in results:
+            totalBlocks += blockCount
+            print(f"{projectPath} -> {', '.join(written)}: {blockCount} blocks in {seconds:.3f}s")
+
+    if args.parallel:
+        exportWorkers = args.jobs or exportWorkers
+        report(_exportProjectFile(projectPath, projectOutputs, parallel=True)
+               for projectPath, projectOutputs in zip(projects, outputs))
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            report(pool.map(_exportProjectFile, projects, outputs))
+    print(f"exported {len(projects)} project(s), {totalBlocks} blocks in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
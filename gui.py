@@ -5,6 +5,7 @@ import os
 import random
 from math import *
 import time
+from collections import OrderedDict
 from tkinter.filedialog import asksaveasfile
 
 ###### SETUP ######
@@ -13,6 +14,32 @@ hdRatio = 1
 pygame.init()
 elementList = []
 mouseTask = False
+defaultFont = 'Minecraftia-Regular.ttf'
+fontCache = {}
+textCache = OrderedDict()
+textCacheSize = 512
+
+###### FUNCTIONS ######
+
+def getFont(path, size):
+    # fonts are loaded from disk once per (path, size) for the whole process
+    key = (path, size)
+    if key not in fontCache:
+        fontCache[key] = pygame.font.Font(path, size)
+    return fontCache[key]
+
+def renderText(font, text, color, antialias=True):
+    # LRU cache of rendered text surfaces; widget text rarely changes between frames
+    key = (font, text, tuple(color), antialias)
+    surface = textCache.get(key)
+    if surface is None:
+        surface = font.render(text, antialias, color)
+        textCache[key] = surface
+        if len(textCache) > textCacheSize:
+            textCache.popitem(last=False)
+    else:
+        textCache.move_to_end(key)
+    return surface
 
 ###### CLASSES ######
 
@@ -26,22 +53,23 @@ class GUI:
         self.x = x * hdRatio
         self.y = y * hdRatio
 
+    def remove(self):
+        if self in elementList:
+            elementList.remove(self)
+
 class Title(GUI):
     def __init__(self, x, y, text, textColor, fontSize=20, fontOverride=None):
         super().__init__(x, y)
         self.text = text
         self.textColor = textColor
         self.fontSize = int(fontSize * hdRatio)
-        if fontOverride:
-            self.font = pygame.font.Font(fontOverride, fontSize)
-        else:
-            self.font = pygame.font.Font('Minecraftia-Regular.ttf', fontSize)
+        self.font = getFont(fontOverride or defaultFont, fontSize)
   
     def setTitle(self, newTitle):
         self.text = newTitle
     
     def draw(self, screen):
-        textSurface = self.font.render(self.text, True, self.textColor)
+        textSurface = renderText(self.font, self.text, self.textColor)
         textRect = textSurface.get_rect(center=(self.x, self.y))
         screen.blit(textSurface, textRect)
 
@@ -74,27 +102,45 @@ class Button(GUI):
         self.cornerRadius = cornerRadius
         self.textColor = (255, 255, 255)
         self.fontSize = int(fontSize * hdRatio)
-        if fontOverride:
-            self.font = pygame.font.Font(fontOverride, fontSize)
-        else:
-            self.font = pygame.font.Font('Minecraftia-Regular.ttf', fontSize)
+        self.font = getFont(fontOverride or defaultFont, fontSize)
+        self.faces = {}
+
+    def moveTo(self, x, y):
+        super().moveTo(x, y)
+        self.rect.center = (self.x, self.y)
+
+    def setText(self, newText):
+        if newText != self.text:
+            self.faces.clear()
+        self.text = newText
+
+    def renderFace(self, buttonColor):
+        # one pre-rendered surface per (state color, text), so hover/selected states are a single blit
+        key = (tuple(buttonColor), self.text)
+        face = self.faces.get(key)
+        if face is None:
+            face = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            localRect = face.get_rect()
+            pygame.draw.rect(face, buttonColor, localRect, border_radius=self.cornerRadius)
+
+            shadowColor = [self.color[0]*0.6,self.color[1]*0.6,self.color[2]*0.6]
+            shadowSurface = renderText(self.font, self.text, shadowColor)
+            textSurface = renderText(self.font, self.text, self.textColor)
+
+            shadowRect = shadowSurface.get_rect(center=[localRect.center[0], localRect.center[1]+self.fontSize/30])
+            textRect = textSurface.get_rect(center=localRect.center)
+
+            face.blit(shadowSurface, shadowRect)
+            face.blit(textSurface, textRect)
+            self.faces[key] = face
+        return face
 
     def draw(self, screen, mode=0):
         buttonColor = self.color
         if self.rect.collidepoint(pygame.mouse.get_pos()) or mode == 1:
             buttonColor = (max(0, self.color[0]-30), max(0, self.color[1]-30), max(0, self.color[2]-30))
 
-        pygame.draw.rect(screen, buttonColor, self.rect, border_radius=self.cornerRadius)
-
-        shadowColor = [self.color[0]*0.6,self.color[1]*0.6,self.color[2]*0.6]
-        shadowSurface = self.font.render(self.text, True, shadowColor)
-        textSurface = self.font.render(self.text, True, self.textColor)
-
-        shadowRect = shadowSurface.get_rect(center=[self.rect.center[0], self.rect.center[1]+self.fontSize/30])
-        textRect = textSurface.get_rect(center=self.rect.center)
-
-        screen.blit(shadowSurface, shadowRect)
-        screen.blit(textSurface, textRect)
+        screen.blit(self.renderFace(buttonColor), self.rect)
 
     def isClicked(self):
         global mouseTask
@@ -104,6 +150,57 @@ class Button(GUI):
             print(self, ' clicked')
         return status
 
+class ProgressBar(GUI):
+    def __init__(self, name, x, y, width, height, cornerRadius, color, fillColor, scale):
+        super().__init__(x, y)
+        self.name = name
+        self.rect = pygame.Rect((x-width*scale/2)*hdRatio, (y-height*scale/2)*hdRatio, width*scale*hdRatio, height*scale*hdRatio)
+        self.color = color
+        self.fillColor = fillColor
+        self.width = int(width * hdRatio)
+        self.height = int(height * hdRatio)
+        self.scale = scale
+        self.cornerRadius = cornerRadius
+        self.progress = 0.0
+
+    def setProgress(self, progress):
+        self.progress = min(max(progress, 0.0), 1.0)
+
+    def draw(self, screen):
+        pygame.draw.rect(screen, self.color, self.rect, border_radius=self.cornerRadius)
+        fillRect = self.rect.copy()
+        fillRect.width = int(self.rect.width * self.progress)
+        if fillRect.width > 0:
+            pygame.draw.rect(screen, self.fillColor, fillRect, border_radius=self.cornerRadius)
+
+class Table(GUI):
+    # anchored at its top-left corner (unlike the other widgets), since its height follows the rows
+    def __init__(self, name, x, y, columnWidths, rowHeight, color, textColor=(255, 255, 255), fontSize=12, padding=6):
+        super().__init__(x, y)
+        self.name = name
+        self.columnWidths = columnWidths
+        self.rowHeight = int(rowHeight * hdRatio)
+        self.color = color
+        self.textColor = textColor
+        self.padding = padding
+        self.font = getFont(defaultFont, int(fontSize * hdRatio))
+        self.rows = []
+        self.rect = pygame.Rect(self.x, self.y, 0, 0)
+
+    def setRows(self, rows):
+        self.rows = rows
+
+    def draw(self, screen):
+        # returns the screen rect covered, so callers can repaint what was underneath later
+        self.rect = pygame.Rect(self.x, self.y, sum(self.columnWidths) + 2 * self.padding, len(self.rows) * self.rowHeight + 2 * self.padding)
+        pygame.draw.rect(screen, self.color, self.rect)
+        for rowIndex, row in enumerate(self.rows):
+            cellX = self.rect.x + self.padding
+            for text, columnWidth in zip(row, self.columnWidths):
+                screen.blit(renderText(self.font, str(text), self.textColor), (cellX, self.rect.y + self.padding + rowIndex * self.rowHeight))
+                cellX += columnWidth
+        return self.rect
+
 class Textbox(GUI):
     def __init__(self, name, x, y, width, height, exampleText, scale, color=(255, 255, 255), fontSize=20, textColor=(0, 0, 0), characterLimit=None):
         super().__init__(x, y)
@@ -118,23 +215,23 @@ class Textbox(GUI):
         self.scale = scale
         self.textColor = textColor
         self.fontSize = int(fontSize * hdRatio)
-        self.font = pygame.font.Font("fonts/Inter-Regular.ttf", self.fontSize)
+        self.font = getFont("fonts/Inter-Regular.ttf", self.fontSize)
         self.characterlimit = characterLimit
 
     def draw(self, screen):
         pygame.draw.rect(screen, self.color, self.rect, border_radius=5)
         if self.selected:
             pygame.draw.rect(screen, self.textColor, self.rect, width=4, border_radius=5)
-            textSurface = self.font.render(self.text, True, self.textColor)
+            textSurface = renderText(self.font, self.text, self.textColor)
             if int(time.time()) % 2 == 0:
-                textSurface = self.font.render(self.text + "|", True, self.textColor)
+                textSurface = renderText(self.font, self.text + "|", self.textColor)
         else:
             pygame.draw.rect(screen, self.textColor, self.rect, width=2, border_radius=5)
             if self.text == "":
                 fadedTextColor = [int((self.color[value] * 2 + self.textColor[value] * 1) / 3) for value in range(len(self.color))]
-                textSurface = self.font.render(self.exampleText, True, fadedTextColor)
+                textSurface = renderText(self.font, self.exampleText, fadedTextColor)
             else:
-                textSurface = self.font.render(self.text, True, self.textColor)
+                textSurface = renderText(self.font, self.text, self.textColor)
         textRect = textSurface.get_rect(center=self.rect.center)
         screen.blit(textSurface, textRect)
 
@@ -172,7 +269,7 @@ class Scrollable(GUI):
         self.cornerRadius = cornerRadius
         self.textColor = (255, 255, 255)
         self.fontSize = int(fontSize * hdRatio)
-        self.font = pygame.font.Font("fonts/Inter-Regular.ttf", self.fontSize)
+        self.font = getFont("fonts/Inter-Regular.ttf", self.fontSize)
 
     def draw(self, screen):
         pygame.draw.rect(screen, self.color, self.rect, border_radius=self.cornerRadius)
@@ -0,0 +1,175 @@
+"""
+history.py — Undo/redo for Dungeon Designer, built on a compact delta log.
+
+Nothing is snapshotted. Each edit (typically one brush stroke, from mouse
+down to mouse up) is stored as a Delta holding:
+
+    floorIndex  which floor was edited
+    channel     'floor' or 'walls'
+    xs, ys      int32 grid coordinates of the cells that actually changed
+    prior       the values those cells had before, bit-packed (1 bit/cell)
+
+Every cell in a delta flipped, so undo writes `prior` back and redo writes its
+inverse; both go through Floor.paint() and cost O(changed cells), whatever the
+size of the floor. The undo log has a memory budget in bytes; when it is
+exceeded the oldest deltas are evicted first.
+"""
+
+from collections import deque
+from typing import List, Tuple
+
+import numpy as np
+
+import layers
+
+
+# ----------------------------- CONFIG CONSTANTS -----------------------------
+
+defaultBudgetBytes = 64 * 1024 * 1024
+
+
+# --------------------------------- DELTAS -----------------------------------
+
+class Delta:
+    __slots__ = ("floorIndex", "channel", "xs", "ys", "prior", "count")
+
+    def __init__(self, floorIndex: int, channel: str, xs: np.ndarray, ys: np.ndarray, prior: np.ndarray):
+        self.floorIndex = floorIndex
+        self.channel = channel
+        self.xs = xs.astype(np.int32)
+        self.ys = ys.astype(np.int32)
+        self.count = len(xs)
+        self.prior = np.packbits(prior.astype(bool))
+
+    @property
+    def nbytes(self) -> int:
+        return self.xs.nbytes + self.ys.nbytes + self.prior.nbytes
+
+    def priorValues(self) -> np.ndarray:
+        return np.unpackbits(self.prior, count=self.count).astype(bool)
+
+    def apply(self, floors: List[layers.Floor], values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Write `values` into this delta's cells; returns the cells that changed.
+        """
+        floor = floors[self.floorIndex]
+        setXs, setYs = floor.paint(self.xs[values], self.ys[values], self.channel, True)
+        clearXs, clearYs = floor.paint(self.xs[~values], self.ys[~values], self.channel, False)
+        return np.concatenate((setXs, clearXs)), np.concatenate((setYs, clearYs))
+
+
+# --------------------------------- HISTORY ----------------------------------
+
+class History:
+    def __init__(self, budgetBytes: int = defaultBudgetBytes):
+        self.budgetBytes = budgetBytes
+        self.undoStack = deque()
+        self.redoStack = []
+        self.usedBytes = 0
+        self.stroke = None  # list of (floorIndex, channel, xs, ys, prior) records while a stroke is open
+
+    def beginStroke(self):
+        self.endStroke()
+        self.stroke = []
+
+    def record(self, floorIndex: int, channel: str, xs: np.ndarray, ys: np.ndarray, prior):
+        """
+        Log cells that just changed, with the value(s) they had before.
+        Inside a stroke, records are merged into one delta per (floor, channel)
+        when the stroke ends; otherwise they become an undo step immediately.
+        """
+        if len(xs) == 0:
+            return
+        prior = np.broadcast_to(np.asarray(prior, dtype=bool), (len(xs),))
+        if self.stroke is not None:
+            self.stroke.append((floorIndex, channel, xs, ys, prior))
+        else:
+            self._push([Delta(floorIndex, channel, np.asarray(xs), np.asarray(ys), prior)])
+
+    def endStroke(self):
+        stroke, self.stroke = self.stroke, None
+        if not stroke:
+            return
+        grouped = {}
+        for floorIndex, channel, xs, ys, prior in stroke:
+            grouped.setdefault((floorIndex, channel), []).append((xs, ys, prior))
+        step = [self._mergeRecords(floorIndex, channel, parts) for (floorIndex, channel), parts in grouped.items()]
+        step = [delta for delta in step if delta.count]
+        if step:  # a stroke that put every cell back is not an undo step
+            self._push(step)
+
+    @staticmethod
+    def _mergeRecords(floorIndex: int, channel: str, parts) -> Delta:
+        """
+        One delta from a stroke's records of one (floor, channel). A cell
+        recorded several times keeps the prior of its first record, and is
+        dropped when its last record flipped it back to that value.
+        """
+        xs = np.concatenate([xs for xs, _ys, _p in parts]).astype(np.int64)
+        ys = np.concatenate([ys for _xs, ys, _p in parts]).astype(np.int64)
+        prior = np.concatenate([p for _xs, _ys, p in parts])
+        # Grid coordinates are unbounded (and may be negative), so each cell is keyed by both as one int64
+        keys = (xs << 32) | (ys & 0xFFFFFFFF)
+        _keys, first = np.unique(keys, return_index=True)
+        _keys, fromEnd = np.unique(keys[::-1], return_index=True)
+        last = len(keys) - 1 - fromEnd
+        # Every record is a change, so a cell ends at the inverse of its last prior
+        changed = prior[first] == prior[last]
+        first = first[changed]
+        return Delta(floorIndex, channel, xs[first], ys[first], prior[first])
+
+    def _push(self, step: List[Delta]):
+        self.redoStack.clear()
+        self._append(step)
+
+    def _append(self, step: List[Delta]):
+        self.undoStack.append(step)
+        self.usedBytes += sum(delta.nbytes for delta in step)
+        # Oldest-first eviction; the newest step is always kept
+        while self.usedBytes > self.budgetBytes and len(self.undoStack) > 1:
+            self.usedBytes -= sum(delta.nbytes for delta in self.undoStack.popleft())
+
+    def undo(self, floors: List[layers.Floor]):
+        """
+        Revert the latest step. Returns [(floorIndex, xs, ys), ...] of the
+        cells that changed, for the canvas to repaint.
+        """
+        self.endStroke()
+        if not self.undoStack:
+            return []
+        step = self.undoStack.pop()
+        self.usedBytes -= sum(delta.nbytes for delta in step)
+        self.redoStack.append(step)
+        return [(delta.floorIndex,) + delta.apply(floors, delta.priorValues()) for delta in reversed(step)]
+
+    def redo(self, floors: List[layers.Floor]):
+        self.endStroke()
+        if not self.redoStack:
+            return []
+        step = self.redoStack.pop()
+        self._append(step)
+        return [(delta.floorIndex,) + delta.apply(floors, ~delta.priorValues()) for delta in step]
+
+    def floorRemoved(self, floorIndex: int):
+        """
+        Drop deltas of a deleted floor and shift the indices of the floors above it.
+        """
+        self.endStroke()
+        for stack in (self.undoStack, self.redoStack):
+            kept = []
+            for step in stack:
+                step = [delta for delta in step if delta.floorIndex != floorIndex]
+                for delta in step:
+                    if delta.floorIndex > floorIndex:
+                        delta.floorIndex -= 1
+                if step:
+                    kept.append(step)
+            stack.clear()
+            stack.extend(kept)
+        self.usedBytes = sum(delta.nbytes for step in self.undoStack for delta in step)
+
+    def clear(self):
+        self.stroke = None
+        self.undoStack.clear()
+        self.redoStack.clear()
+        self.usedBytes = 0
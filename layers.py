@@ -0,0 +1,518 @@
+"""
+layers.py — Compact floor/wall layer storage for Dungeon Designer.
+
+Each floor is stored as sparse 16×16 NumPy uint8 chunks indexed [x, y],
+allocated on demand, where every cell is a small bitmask:
+
+    bit 0 (FLOOR) -> the cell has a floor block
+    bit 1 (WALLS) -> the cell has a wall column
+
+This replaces the old per-cell dict keyed by (x, y, 'floor'|'walls') tuples,
+which cost a hash entry per painted cell and had to be walked in full for
+every draw and every export pass.
+
+The legacy dict format is still accepted everywhere floors are consumed:
+
+    { 'name': 'Floor 1', 'cells': { (x, y, 'floor'): True, (x, y, 'walls'): True, ... } }
+
+Use toFloor()/toFloors() to adapt such dicts, and Floor.toCells() to go back.
+"""
+
+import hashlib
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+
+# ----------------------------- CONFIG CONSTANTS -----------------------------
+
+FLOOR = 1  # bit for the floor channel
+WALLS = 2  # bit for the walls channel
+
+# channel name (as used by the editor's `mode` and the legacy cell keys) -> bit
+channelBits = {
+    "floor": FLOOR,
+    "walls": WALLS,
+}
+
+# floors are stored as 16×16 chunks, matching Minecraft chunks
+chunkShift = 4
+chunkSize = 1 << chunkShift
+chunkMask = chunkSize - 1
+
+
+# ---------------------------------- MODEL -----------------------------------
+
+def _chunkRange(start: int, stop: int) -> range:
+    """
+    Chunk indices overlapping the cell range [start, stop).
+    """
+    return range(start >> chunkShift, ((stop - 1) >> chunkShift) + 1) if stop > start else range(0)
+
+
+class Floor:
+    """
+    One editable floor: a name plus a sparse set of 16×16 chunks.
+
+    `chunks[(cx, cy)]` is a uint8 [x, y] array holding the FLOOR/WALLS bits of
+    cells (cx*16 .. cx*16+15, cy*16 .. cy*16+15). Chunks are allocated the
+    first time one of their cells is set and dropped again once erased, so a
+    floor costs memory in proportion to what is painted, wherever it is, and
+    grid coordinates may be any integers (including negative ones).
+
+    A floor can also be created lazily from a `loader` (any object with a
+    decode() method returning (originX, originY, mask), see project.py); it is
+    then only decoded the first time its cells are accessed, and a decode()
+    error propagates from that access (and from every later one).
+    """
+
+    def __init__(self, name: str, mask: np.ndarray = None, origin: Tuple[int, int] = (0, 0), loader=None):
+        self.name = name
+        self._chunks = {}
+        # contentHash() memo; a one-item list shared with copies until either
+        # side is written to, so a snapshot that hashes itself also fills in
+        # the hash of the unchanged original
+        self._hash = [None]
+        self.revision = 0  # bumped on every write, for caches of how the floor is drawn
+        self.loader = loader
+        if mask is not None:
+            self.setRegion(origin[0], origin[1], mask)
+
+    @property
+    def chunks(self) -> Dict[Tuple[int, int], np.ndarray]:
+        loader = self.loader
+        if loader is not None:
+            # the loader is dropped only once decode() succeeded, so a floor
+            # whose data is damaged keeps failing instead of turning empty
+            originX, originY, mask = loader.decode()
+            if self.loader is loader:
+                self.loader = None
+                self.setRegion(originX, originY, mask)
+        return self._chunks
+
+    @property
+    def isLoaded(self) -> bool:
+        return self.loader is None
+
+    def bounds(self) -> Tuple[int, int, int, int]:
+        """
+        Chunk-aligned (x0, y0, x1, y1) cell bounds of everything allocated,
+        ends exclusive; (0, 0, 0, 0) for an empty floor.
+        """
+        chunks = self.chunks
+        if not chunks:
+            return 0, 0, 0, 0
+        keys = np.array(list(chunks), dtype=np.int64)
+        (cx0, cy0), (cx1, cy1) = keys.min(axis=0), keys.max(axis=0) + 1
+        return int(cx0) << chunkShift, int(cy0) << chunkShift, int(cx1) << chunkShift, int(cy1) << chunkShift
+
+    def chunksIn(self, x0: int, y0: int, x1: int, y1: int) -> List[Tuple[Tuple[int, int], np.ndarray]]:
+        """
+        Allocated chunks overlapping the cell window [x0, x1) × [y0, y1), as
+        ((cx, cy), chunk) pairs. Costs whichever is smaller: the number of
+        chunk slots in the window or the number of allocated chunks.
+        """
+        chunks = self.chunks
+        xRange, yRange = _chunkRange(x0, x1), _chunkRange(y0, y1)
+        if len(xRange) * len(yRange) <= len(chunks):
+            found = ((key, chunks.get(key)) for key in ((cx, cy) for cx in xRange for cy in yRange))
+            return [(key, chunk) for key, chunk in found if chunk is not None]
+        return [((cx, cy), chunk) for (cx, cy), chunk in chunks.items() if cx in xRange and cy in yRange]
+
+    def region(self, x0: int, y0: int, x1: int, y1: int) -> np.ndarray:
+        """
+        Dense uint8 [x, y] copy of the cell window [x0, x1) × [y0, y1).
+        """
+        mask = np.zeros((max(x1 - x0, 0), max(y1 - y0, 0)), dtype=np.uint8)
+        for (cx, cy), chunk in self.chunksIn(x0, y0, x1, y1):
+            baseX, baseY = cx << chunkShift, cy << chunkShift
+            ax0, ay0 = max(x0, baseX), max(y0, baseY)
+            ax1, ay1 = min(x1, baseX + chunkSize), min(y1, baseY + chunkSize)
+            mask[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = chunk[ax0 - baseX:ax1 - baseX, ay0 - baseY:ay1 - baseY]
+        return mask
+
+    def toDense(self) -> Tuple[int, int, np.ndarray]:
+        """
+        The whole floor as one dense grid: (originX, originY, mask) where
+        mask[x, y] is the cell at (originX + x, originY + y).
+        """
+        x0, y0, x1, y1 = self.bounds()
+        return x0, y0, self.region(x0, y0, x1, y1)
+
+    def setRegion(self, x0: int, y0: int, mask: np.ndarray):
+        """
+        Overwrite the cells of the window starting at (x0, y0) with `mask`
+        (uint8 [x, y] bits), allocating and dropping chunks as needed.
+
+        The window is widened to whole chunks (keeping the cells around
+        `mask`), cut into 16×16 blocks with one reshape, and every non-empty
+        block is stored as it is, so large regions cost a few array operations
+        plus one dict write per chunk.
+        """
+        chunks = self._chunks if self.loader is None else self.chunks
+        self._hash = [None]
+        self.revision += 1
+        x1, y1 = x0 + mask.shape[0], y0 + mask.shape[1]
+        if x1 <= x0 or y1 <= y0:
+            return
+        ax0, ay0 = (x0 >> chunkShift) << chunkShift, (y0 >> chunkShift) << chunkShift
+        ax1, ay1 = (((x1 - 1) >> chunkShift) + 1) << chunkShift, (((y1 - 1) >> chunkShift) + 1) << chunkShift
+        if (ax0, ay0, ax1, ay1) == (x0, y0, x1, y1):
+            aligned = mask
+        else:
+            aligned = self.region(ax0, ay0, ax1, ay1)
+            aligned[x0 - ax0:x1 - ax0, y0 - ay0:y1 - ay0] = mask
+        nx, ny = (ax1 - ax0) >> chunkShift, (ay1 - ay0) >> chunkShift
+        # (nx, ny, 16, 16), copied so no chunk shares memory with the caller's mask
+        blocks = np.asarray(aligned, dtype=np.uint8).reshape(nx, chunkSize, ny, chunkSize).swapaxes(1, 2).copy()
+        filled = blocks.reshape(nx, ny, -1).any(axis=2)
+
+        cx0, cy0 = ax0 >> chunkShift, ay0 >> chunkShift
+        for (cx, cy), _chunk in self.chunksIn(ax0, ay0, ax1, ay1):
+            if not filled[cx - cx0, cy - cy0]:
+                del chunks[(cx, cy)]
+        ixs, iys = np.nonzero(filled)
+        for ix, iy in zip(ixs.tolist(), iys.tolist()):
+            chunks[(cx0 + ix, cy0 + iy)] = blocks[ix, iy]
+
+    def get(self, x: int, y: int, channel: str) -> bool:
+        chunk = self.chunks.get((x >> chunkShift, y >> chunkShift))
+        if chunk is None:
+            return False
+        return bool(chunk[x & chunkMask, y & chunkMask] & channelBits[channel])
+
+    def set(self, x: int, y: int, channel: str, value: bool = True) -> bool:
+        """
+        Set or clear one channel of one cell.
+        Returns True if the cell actually changed.
+        """
+        changedXs, _changedYs = self.paint([x], [y], channel, value)
+        return len(changedXs) > 0
+
+    def paint(self, xs, ys, channel: str, value: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Set or clear one channel over many cells, with one batched write per
+        touched chunk. Cells already in the target state are skipped. Returns
+        the grid (x, y) coordinates that changed.
+        """
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        chunks = self.chunks
+        bit = channelBits[channel]
+        if len(xs) == 0:
+            return xs, ys
+
+        # Group cells by chunk
+        cxs, cys = xs >> chunkShift, ys >> chunkShift
+        order = np.lexsort((cys, cxs))
+        xs, ys, cxs, cys = xs[order], ys[order], cxs[order], cys[order]
+        starts = np.flatnonzero(np.r_[True, (cxs[1:] != cxs[:-1]) | (cys[1:] != cys[:-1])])
+        ends = np.r_[starts[1:], len(xs)]
+
+        changedXs, changedYs = [], []
+        for start, end, cx, cy in zip(starts.tolist(), ends.tolist(), cxs[starts].tolist(), cys[starts].tolist()):
+            chunk = chunks.get((cx, cy))
+            if chunk is None:
+                if not value:
+                    continue
+                chunk = chunks[(cx, cy)] = np.zeros((chunkSize, chunkSize), dtype=np.uint8)
+            lx, ly = xs[start:end] & chunkMask, ys[start:end] & chunkMask
+            pending = ((chunk[lx, ly] & bit) != 0) != value
+            if pending.any():
+                # A stroke may cross the same cell twice; report each change once
+                flat = np.unique((lx[pending] << chunkShift) | ly[pending])
+                lx, ly = flat >> chunkShift, flat & chunkMask
+                if value:
+                    chunk[lx, ly] |= bit
+                else:
+                    chunk[lx, ly] &= ~bit & 0xFF
+                self._hash = [None]
+                self.revision += 1
+                changedXs.append(lx + (cx << chunkShift))
+                changedYs.append(ly + (cy << chunkShift))
+            if not value and not chunk.any():
+                del chunks[(cx, cy)]
+
+        if not changedXs:
+            return xs[:0], ys[:0]
+        return np.concatenate(changedXs), np.concatenate(changedYs)
+
+    def cellCoords(self, channel: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Grid (x, y) coordinates of every filled cell of a channel, as two int arrays.
+        """
+        bit = channelBits[channel]
+        allXs, allYs = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+        for (cx, cy), chunk in self.chunks.items():
+            xs, ys = np.nonzero(chunk & bit)
+            allXs.append(xs + (cx << chunkShift))
+            allYs.append(ys + (cy << chunkShift))
+        return np.concatenate(allXs), np.concatenate(allYs)
+
+    def isEmpty(self) -> bool:
+        return not self.chunks
+
+    def contentHash(self) -> bytes:
+        """
+        Digest of the painted cells (not the name), for caches of data derived
+        from them. Memoized until the next write.
+        """
+        if self._hash[0] is None:
+            keys = sorted(self.chunks)
+            digest = hashlib.blake2b(np.array(keys, dtype=np.int32).tobytes(), digest_size=16)
+            digest.update(b"".join(self._chunks[key].tobytes() for key in keys))
+            self._hash[0] = digest.digest()
+        return self._hash[0]
+
+    def copy(self) -> "Floor":
+        loader = self.loader
+        if loader is not None:
+            # still lazy: share the loader rather than decoding now
+            return Floor(self.name, loader=loader)
+        floor = Floor(self.name)
+        floor._chunks = {key: chunk.copy() for key, chunk in self._chunks.items()}
+        floor._hash = self._hash
+        return floor
+
+    def toCells(self) -> Dict[Tuple[int, int, str], bool]:
+        """
+        Legacy view of this floor as a { (x, y, 'floor'|'walls'): True } dict.
+        """
+        cells = {}
+        for channelName in channelBits:
+            xs, ys = self.cellCoords(channelName)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                cells[(x, y, channelName)] = True
+        return cells
+
+    @classmethod
+    def fromCells(cls, name: str, cells: Dict[Tuple[int, int, str], bool]) -> "Floor":
+        """
+        Build a Floor from a legacy cell dict.
+        """
+        floor = cls(name)
+        for channelName in channelBits:
+            filled = [(x, y) for (x, y, typ), value in cells.items() if value and typ == channelName]
+            if filled:
+                coords = np.array(filled, dtype=np.int64)
+                floor.paint(coords[:, 0], coords[:, 1], channelName, True)
+        return floor
+
+    def __getstate__(self):
+        # decode lazy floors; loaders are tied to an open file
+        return {"name": self.name, "chunks": self.chunks}
+
+    def __setstate__(self, state):
+        self.name = state["name"]
+        self._chunks = dict(state["chunks"])
+        self._hash = [None]
+        self.revision = 0
+        self.loader = None
+
+    def __repr__(self):
+        if self.loader is not None:
+            return f"Floor({self.name!r}, not loaded)"
+        return f"Floor({self.name!r}, {len(self._chunks)} chunks)"
+
+
+# -------------------------------- RASTERIZING -------------------------------
+
+def lineCells(x0: int, y0: int, x1: int, y1: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Grid cells on the segment (x0, y0)-(x1, y1), both ends included, using
+    Bresenham's algorithm (8-connected, no gaps).
+    """
+    dx = abs(x1 - x0)
+    dy = -abs(y1 - y0)
+    stepX = 1 if x0 < x1 else -1
+    stepY = 1 if y0 < y1 else -1
+    error = dx + dy
+    xs, ys = [], []
+    while True:
+        xs.append(x0)
+        ys.append(y0)
+        if x0 == x1 and y0 == y1:
+            break
+        doubled = 2 * error
+        if doubled >= dy:
+            error += dy
+            x0 += stepX
+        if doubled <= dx:
+            error += dx
+            y0 += stepY
+    return np.array(xs, dtype=np.int64), np.array(ys, dtype=np.int64)
+
+
+# -------------------------------- MORPHOLOGY --------------------------------
+
+def dilate(cells: np.ndarray, connectivity: int = 8) -> np.ndarray:
+    """
+    Grow a boolean [x, y] grid by one cell: to the 4 edge neighbours, or to
+    all 8 neighbours (a separable 3×3 box) when connectivity is 8.
+    """
+    if connectivity not in (4, 8):
+        raise ValueError(f"connectivity must be 4 or 8, not {connectivity!r}")
+    padded = np.pad(cells.astype(bool), 1)
+    if connectivity == 8:
+        rows = padded[:-2] | padded[1:-1] | padded[2:]
+        return rows[:, :-2] | rows[:, 1:-1] | rows[:, 2:]
+    return (padded[1:-1, 1:-1] | padded[:-2, 1:-1] | padded[2:, 1:-1]
+            | padded[1:-1, :-2] | padded[1:-1, 2:])
+
+
+def wallOutline(floorCells: np.ndarray, connectivity: int = 8, thickness: int = 1) -> np.ndarray:
+    """
+    Wall cells around a footprint: the footprint dilated `thickness` times,
+    minus the footprint itself. Cells beyond the grid are not included, so
+    pad the grid by `thickness` to get the whole outline.
+    """
+    grown = floorCells.astype(bool)
+    for _step in range(thickness):
+        grown = dilate(grown, connectivity)
+    return grown & ~floorCells.astype(bool)
+
+
+def autoWallsRegion(floor: Floor, connectivity: int = 8, thickness: int = 1) -> Tuple[int, int, np.ndarray]:
+    """
+    The window of a floor (x0, y0, mask) with walls added around its floor
+    cells, as one array pass; existing walls are kept. Write it back with
+    floor.setRegion(x0, y0, mask).
+    """
+    x0, y0, x1, y1 = floor.bounds()
+    x0, y0, x1, y1 = x0 - thickness, y0 - thickness, x1 + thickness, y1 + thickness
+    mask = floor.region(x0, y0, x1, y1)
+    mask |= wallOutline((mask & FLOOR) != 0, connectivity, thickness) * np.uint8(WALLS)
+    return x0, y0, mask
+
+
+def autoWalls(floor: Floor, connectivity: int = 8, thickness: int = 1) -> Floor:
+    """
+    A copy of `floor` with walls added around its floor cells.
+    """
+    walled = floor.copy()
+    if not walled.isEmpty():
+        walled.setRegion(*autoWallsRegion(walled, connectivity, thickness))
+    return walled
+
+
+# --------------------------------- FILLING ----------------------------------
+
+labelMinCells = 1 << 20  # "auto" flood fills use scipy.ndimage.label from this many cells up, when installed
+
+
+def _spanFill(openCells: np.ndarray, x: int, y: int) -> np.ndarray:
+    """
+    Scanline flood fill. Every column is cut into spans (runs of open cells
+    along y) in one vectorized pass; the fill then walks from span to span,
+    finding the spans it touches in the neighbouring columns through ranges
+    precomputed for all spans with binary searches, and paints the visited
+    spans back with one cumulative sum. Python work is per span reached and
+    per overlap, never per cell.
+    """
+    width, height = openCells.shape
+    edges = np.diff(np.pad(openCells, ((0, 0), (1, 1))).view(np.int8), axis=1)
+    startXs, startYs = np.nonzero(edges == 1)
+    endYs = np.nonzero(edges == -1)[1]
+    # spans are sorted by (x, y); keys are flat cell indices x * height + y
+    startKeys = startXs * height + startYs
+    endKeys = startXs * height + endYs
+
+    # for every span, the range of spans overlapping it in the columns to its left and right
+    # (ranges that would cross into another column are empty, as ends never exceed height)
+    neighbours = []
+    for dx in (-1, 1):
+        first = np.searchsorted(endKeys, startKeys + dx * height, side="right")
+        stop = np.searchsorted(startKeys, endKeys + dx * height, side="left")
+        neighbours.append((first.tolist(), stop.tolist()))
+    (leftFirst, leftStop), (rightFirst, rightStop) = neighbours
+
+    seed = int(np.searchsorted(startKeys, x * height + y, side="right")) - 1
+    visited = bytearray(len(startKeys))
+    visited[seed] = 1
+    pending = [seed]
+    while pending:
+        span = pending.pop()
+        for other in range(leftFirst[span], leftStop[span]):
+            if not visited[other]:
+                visited[other] = 1
+                pending.append(other)
+        for other in range(rightFirst[span], rightStop[span]):
+            if not visited[other]:
+                visited[other] = 1
+                pending.append(other)
+
+    reached = np.frombuffer(visited, dtype=bool)
+    coverage = np.zeros(width * height + 1, dtype=np.int8)
+    coverage[startKeys[reached]] += 1
+    coverage[endKeys[reached]] -= 1
+    return np.cumsum(coverage[:-1], dtype=np.int8).view(bool).reshape(width, height)
+
+
+def _labelFill(openCells: np.ndarray, x: int, y: int) -> np.ndarray:
+    from scipy import ndimage
+
+    labels, _count = ndimage.label(openCells)
+    return labels == labels[x, y]
+
+
+def floodFill(openCells: np.ndarray, x: int, y: int, method: str = "auto") -> np.ndarray:
+    """
+    Cells 4-connected to (x, y) through `openCells` (a boolean [x, y] grid),
+    as a boolean grid of the same shape; empty when (x, y) is not open.
+
+    method is "scanline" (_spanFill, NumPy only), "label" (connected-component
+    labelling with scipy.ndimage, which must be installed) or "auto": label
+    for grids of labelMinCells or more when scipy is available, else scanline.
+    """
+    openCells = np.asarray(openCells, dtype=bool)
+    if not openCells[x, y]:
+        return np.zeros_like(openCells)
+    if method == "label":
+        return _labelFill(openCells, x, y)
+    if method == "auto" and openCells.size >= labelMinCells:
+        try:
+            return _labelFill(openCells, x, y)
+        except ImportError:
+            pass
+    return _spanFill(openCells, x, y)
+
+
+def bucketFillRegion(floor: Floor, x: int, y: int, channel: str, value: bool,
+                     window: Tuple[int, int, int, int], method: str = "auto") -> Tuple[int, int, np.ndarray]:
+    """
+    The cell window (x0, y0, x1, y1) of a floor (as x0, y0, mask) after a
+    bucket fill at (x, y): the region of cells 4-connected to it with the same
+    state in `channel` gets `channel` set to `value`. Walls bound the region
+    (unless walls are being filled), and so does the window.
+    """
+    x0, y0, x1, y1 = window
+    mask = floor.region(x0, y0, x1, y1)
+    if not (x0 <= x < x1 and y0 <= y < y1):
+        return x0, y0, mask
+    bit = channelBits[channel]
+    state = (mask & bit) != 0
+    openCells = state == state[x - x0, y - y0]
+    if bit != WALLS:
+        openCells &= (mask & WALLS) == 0
+    filled = floodFill(openCells, x - x0, y - y0, method)
+    if value:
+        mask[filled] |= bit
+    else:
+        mask[filled] &= ~bit & 0xFF
+    return x0, y0, mask
+
+
+# ------------------------------ COMPAT ADAPTER ------------------------------
+
+def toFloor(layer: Union[Floor, dict], index: int = 0) -> Floor:
+    """
+    Accept either a Floor or a legacy { 'name': ..., 'cells': {...} } dict.
+    """
+    if isinstance(layer, Floor):
+        return layer
+    return Floor.fromCells(layer.get("name", f"Floor {index + 1}"), layer.get("cells", {}))
+
+
+def toFloors(floors: List[Union[Floor, dict]]) -> List[Floor]:
+    return [toFloor(layer, idx) for idx, layer in enumerate(floors)]
+
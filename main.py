@@ -1,6 +1,7 @@
 ###### IMPORT ######
 
 import pygame
+import argparse
 import random
 import time
 from math import *
@@ -9,19 +10,31 @@ import copy
 import bisect
 import pickle as pkl
 from tkinter.filedialog import asksaveasfile
+from tkinter.filedialog import asksaveasfilename
 from tkinter.filedialog import askopenfilename
 
 import gui
 import gen
+import layers
+import canvas
+import project
+import history
+import procgen
+import prefabs
+import profiling
 
 ###### SETUP ######
 
+argParser = argparse.ArgumentParser(description="Dungeon Designer")
+argParser.add_argument("--hud", action="store_true", help="start with the frame-time HUD shown (toggle with F3)")
+argParser.add_argument("--profile", metavar="PATH", help="record a cProfile of the whole session to PATH (.prof); F5 records one on demand")
+argParser.add_argument("--trace", metavar="PATH", help="record the per-phase timings of the session to PATH (Chrome trace JSON)")
+args, _unknownArgs = argParser.parse_known_args()
+
 windowSize = (1440, 900)
 
 pygame.display.set_caption("Dungeon Designer") # Sets title of window
 screen = pygame.display.set_mode(windowSize) # Sets the dimensions of the window to the windowSize
-floorSurface = pygame.Surface(windowSize, pygame.SRCALPHA)
-wallsSurface = pygame.Surface(windowSize, pygame.SRCALPHA)
 
 font = pygame.font.Font("Minecraftia-Regular.ttf", 12)
 
@@ -39,8 +52,11 @@ SAMPLINGRESOLUTION = 500
 
 ###### INITIALIZE ######
 
-fps = 60
+fps = 60 # frame rate while anything is moving; idle frames are not drawn at all
+idleWaitMs = 500 # longest an idle loop blocks in pygame.event.wait before checking again
+settleFrameCount = 2 # frames still drawn after the last input, so changes made late in a frame get shown
 clock = pygame.time.Clock()
+pygame.key.set_repeat(250, 30) # held arrow keys keep panning
 
 appTitle = gui.Title(
     x=1275,
@@ -53,17 +69,69 @@ appTitle = gui.Title(
 
 addFloorButton = gui.Button(
     name="add_floor_button",
-    width=300,
+    width=93,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Add",
+    x=1172,
+    y=120,
+    scale=1,
+    fontSize=20
+)
+
+onionButton = gui.Button(
+    name="onion_button",
+    width=93,
     height=40,
     cornerRadius = 8,
     color=[100, 100, 100],
-    text="Add Floor",
+    text="Onion",
     x=1275,
     y=120,
     scale=1,
     fontSize=20
 )
 
+deleteFloorButton = gui.Button(
+    name="delete_floor_button",
+    width=93,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Delete",
+    x=1378,
+    y=120,
+    scale=1,
+    fontSize=20
+)
+
+autoWallsButton = gui.Button(
+    name="auto_walls_button",
+    width=140,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Auto Walls",
+    x=1195,
+    y=540,
+    scale=1,
+    fontSize=20
+)
+
+wallStyleButton = gui.Button(
+    name="wall_style_button",
+    width=140,
+    height=40,
+    cornerRadius = 8,
+    color=[80, 80, 80],
+    text="8-way x1",
+    x=1355,
+    y=540,
+    scale=1,
+    fontSize=20
+)
+
 editWalls = gui.Button(
     name="edit_walls_button",
     width=140,
@@ -72,7 +140,7 @@ editWalls = gui.Button(
     color=[100, 100, 100],
     text="Walls",
     x=1195,
-    y=600,
+    y=590,
     scale=1,
     fontSize=20
 )
@@ -85,33 +153,150 @@ editFloor = gui.Button(
     color=[100, 100, 100],
     text="Floor",
     x=1355,
-    y=600,
+    y=590,
     scale=1,
     fontSize=20
 )
 
 drawButton = gui.Button(
     name="draw_button",
-    width=140,
+    width=72,
     height=40,
     cornerRadius = 8,
     color=[100, 100, 100],
     text="Draw",
-    x=1195,
-    y=660,
+    x=1161,
+    y=640,
     scale=1,
-    fontSize=20
+    fontSize=16
+)
+
+bucketButton = gui.Button(
+    name="bucket_button",
+    width=72,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Bucket",
+    x=1237,
+    y=640,
+    scale=1,
+    fontSize=16
+)
+
+selectButton = gui.Button(
+    name="select_button",
+    width=72,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Select",
+    x=1313,
+    y=640,
+    scale=1,
+    fontSize=16
 )
 
 eraseButton = gui.Button(
     name="erase_button",
-    width=140,
+    width=72,
     height=40,
     cornerRadius = 8,
     color=[100, 100, 100],
     text="Erase",
+    x=1389,
+    y=640,
+    scale=1,
+    fontSize=16
+)
+
+storePrefabButton = gui.Button(
+    name="store_prefab_button",
+    width=72,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Store",
+    x=1161,
+    y=690,
+    scale=1,
+    fontSize=16
+)
+
+prefabButton = gui.Button(
+    name="prefab_button",
+    width=148,
+    height=40,
+    cornerRadius = 8,
+    color=[80, 80, 80],
+    text="No prefabs",
+    x=1275,
+    y=690,
+    scale=1,
+    fontSize=16
+)
+
+stampButton = gui.Button(
+    name="stamp_button",
+    width=72,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Stamp",
+    x=1389,
+    y=690,
+    scale=1,
+    fontSize=16
+)
+
+generateButton = gui.Button(
+    name="generate_button",
+    width=140,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Generate",
+    x=1195,
+    y=740,
+    scale=1,
+    fontSize=20
+)
+
+generateAllButton = gui.Button(
+    name="generate_all_button",
+    width=140,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Gen. All",
+    x=1355,
+    y=740,
+    scale=1,
+    fontSize=20
+)
+
+openButton = gui.Button(
+    name="open_button",
+    width=140,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Open",
+    x=1195,
+    y=800,
+    scale=1,
+    fontSize=20
+)
+
+saveButton = gui.Button(
+    name="save_button",
+    width=140,
+    height=40,
+    cornerRadius = 8,
+    color=[100, 100, 100],
+    text="Save",
     x=1355,
-    y=660,
+    y=800,
     scale=1,
     fontSize=20
 )
@@ -129,6 +314,29 @@ exportButton = gui.Button(
     fontSize=20
 )
 
+hudTable = gui.Table(
+    name="profiling_hud",
+    x=10,
+    y=10,
+    columnWidths=[110, 60, 60, 60],
+    rowHeight=16,
+    color=[15, 15, 15],
+    textColor=[200, 230, 200],
+    fontSize=10
+)
+
+exportProgress = gui.ProgressBar(
+    name="export_progress",
+    width=300,
+    height=8,
+    cornerRadius = 4,
+    color=[45, 45, 45],
+    fillColor=[70, 160, 70],
+    x=1275,
+    y=830,
+    scale=1
+)
+
 
 
 ###### FUNCTIONS ######
@@ -140,116 +348,510 @@ def dir(point1, point2): # calculates the direction between one point and anothe
     return atan2((point2[1] - point1[1]), (point2[0] - point1[0]))
 
 def screenSpaceToPixels(coords):
-    return (coords[0] // gridScalePx, coords[1] // gridScalePx)
+    return floorCanvas.screenToCell(coords)
+
+def strokeTo(pos): # rasterizes the brush segment from the last stroke point to pos (Bresenham) into strokeCells
+    global lastStrokeCell
+    if not floorCanvas.rect.collidepoint(pos):
+        lastStrokeCell = None
+        return
+    cell = screenSpaceToPixels(pos)
+    strokeCells.append(layers.lineCells(*(lastStrokeCell or cell), *cell))
+    lastStrokeCell = cell
+
+def replaceRegion(floorIndex, x0, y0, mask): # overwrites a window of a floor, logging the cells that changed for undo
+    floor = floors[floorIndex]
+    prior = floor.region(x0, y0, x0 + mask.shape[0], y0 + mask.shape[1])
+    floor.setRegion(x0, y0, mask)
+    recordRegion(floorIndex, x0, y0, prior, mask)
+
+def recordRegion(floorIndex, x0, y0, prior, current): # logs a window's changed cells for undo and marks them for repaint
+    changed = prior ^ current
+    for channel, bit in layers.channelBits.items():
+        xs, ys = np.nonzero(changed & bit)
+        editHistory.record(floorIndex, channel, xs + x0, ys + y0, (prior[xs, ys] & bit) != 0)
+    xs, ys = np.nonzero(changed)
+    floorCanvas.markCells(floors[floorIndex], xs + x0, ys + y0)
+
+def wallStyleText():
+    connectivity, thickness = wallStyles[wallStyle]
+    return f"{connectivity}-way x{thickness}"
+
+def generateFloors(floorIndices): # fills the visible part of the given floors with a procedural layout, as one undo step
+    seed = random.randrange(1 << 31)
+    x0, y0, x1, y1 = floorCanvas.visibleCells()
+    editHistory.beginStroke()
+    for floorIndex, floorSeed in zip(floorIndices, procgen.floorSeeds(seed, len(floorIndices))):
+        replaceRegion(floorIndex, x0, y0, procgen.generateMask(x1 - x0, y1 - y0, floorSeed))
+    editHistory.endStroke()
+    print('generated with seed', seed)
+
+def bucketFill(pos): # flood-fills the region under pos in the current channel, clearing it if the cell is set, else setting it
+    floor = floors[selectedFloor]
+    x, y = screenSpaceToPixels(pos)
+    # the region is bounded by walls, and by the painted extent of the floor or the view (whichever is larger) plus a margin
+    window = floorCanvas.visibleCells()
+    if not floor.isEmpty():
+        bounds = floor.bounds()
+        window = (min(window[0], bounds[0]) - 1, min(window[1], bounds[1]) - 1,
+                  max(window[2], bounds[2]) + 1, max(window[3], bounds[3]) + 1)
+    replaceRegion(selectedFloor, *layers.bucketFillRegion(floor, x, y, mode, not floor.get(x, y, mode), window))
+
+def cellBox(cellA, cellB): # cell box (x0, y0, x1, y1), ends exclusive, spanning two corner cells
+    return (min(cellA[0], cellB[0]), min(cellA[1], cellB[1]), max(cellA[0], cellB[0]) + 1, max(cellA[1], cellB[1]) + 1)
+
+def copySelection():
+    global clipboard
+    if selection is not None:
+        clipboard = floors[selectedFloor].region(*selection)
+
+def cutSelection(): # copies the selection, then clears it as one undo step
+    copySelection()
+    if selection is not None:
+        editHistory.beginStroke()
+        replaceRegion(selectedFloor, selection[0], selection[1], np.zeros_like(clipboard))
+        editHistory.endStroke()
+
+def pasteBox(pos): # cells the clipboard would cover, centred on the cell under pos
+    x, y = screenSpaceToPixels(pos)
+    x0, y0 = x - clipboard.shape[0] // 2, y - clipboard.shape[1] // 2
+    return x0, y0, x0 + clipboard.shape[0], y0 + clipboard.shape[1]
+
+def pasteAt(pos, floorIndices): # stamps the clipboard onto the given floors (inside the open stroke, so one undo step)
+    x0, y0, x1, y1 = pasteBox(pos)
+    for floorIndex in floorIndices:
+        # cells the clipboard sets replace the floor's; its empty cells keep what is already there
+        prior = prefabs.stamp(floors[floorIndex], x0, y0, clipboard)
+        recordRegion(floorIndex, x0, y0, prior, floors[floorIndex].region(x0, y0, x1, y1))
+
+def transformClipboard(turns=0, mirrored=False):
+    global clipboard
+    if clipboard is not None:
+        clipboard = np.ascontiguousarray(prefabs.transform(clipboard, turns, mirrored))
+
+def storePrefab(): # adds the selection (or else the clipboard) to the prefab library and saves it
+    global prefabIndex
+    mask = floors[selectedFloor].region(*selection) if selection is not None else clipboard
+    if mask is None:
+        return
+    prefabLibrary.append(prefabs.Prefab(f'Prefab {len(prefabLibrary) + 1}', mask))
+    prefabIndex = len(prefabLibrary) - 1
+    try:
+        prefabs.save(prefabs.defaultLibraryPath, prefabLibrary)
+    except OSError as error: # the prefab stays in this session's library
+        print('prefab library not saved:', error)
+    prefabButton.setText(prefabText())
+
+def prefabText():
+    if not prefabLibrary:
+        return "No prefabs"
+    return prefabLibrary[prefabIndex].name
+
+def canvasOutlines(): # selection box, and the footprint of the clipboard while pasting
+    outlines = []
+    if selection is not None:
+        outlines.append((selection, selectionColor))
+    mousePos = pygame.mouse.get_pos()
+    if brush == 'paste' and clipboard is not None and floorCanvas.rect.collidepoint(mousePos):
+        outlines.append((pasteBox(mousePos), pasteColor))
+    return outlines
+
+def isAnimating(): # true while something changes without input: a held mouse button (strokes, drags) or a running export
+    return bool(pygame.mouse.get_pressed()[0]) or exportJob is not None
+
+def nextEvents(): # this frame's events; when nothing is animating, blocks until there is input (or idleWaitMs passes)
+    if isAnimating() or settleFrames:
+        return pygame.event.get()
+    event = pygame.event.wait(idleWaitMs)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+def onionNeighbours(): # (floor, distance) pairs drawn as onion skin around the selected floor
+    if not onionSkin:
+        return []
+    return [(floors[selectedFloor + distance], distance)
+            for distance in range(-onionDepth, onionDepth + 1)
+            if distance and 0 <= selectedFloor + distance < len(floors)]
+
+def drawFloorThumbnail(floor, floorButton): # cached preview at the right end of a floor button, refreshed after edits (not mid-stroke)
+    cached = floorThumbnails.get(floor)
+    if (cached is None or cached[0] != floor.revision) and floor.isLoaded and not pygame.mouse.get_pressed()[0]:
+        cached = floorThumbnails[floor] = (floor.revision, canvas.floorThumbnail(floor, thumbnailSize))
+    if cached is not None:
+        screen.blit(cached[1], (floorButton.rect.right - thumbnailSize - 6, floorButton.rect.centery - thumbnailSize // 2))
+
+def syncFloorButtons(): # keeps one persistent selector button per floor, created/removed only when floors change
+    while len(floorButtons) > len(floors):
+        floorButtons.pop().remove()
+    for i in range(len(floorButtons), len(floors)):
+        floorButtons.append(gui.Button(
+            name=f"floor_{i + 1}",
+            width=300,
+            height=30,
+            cornerRadius = 8,
+            color=[80, 80, 80],
+            text=f"Floor {i + 1}",
+            x=1275,
+            y=(i + 1)*35 + 125,
+            scale=1,
+            fontSize=17
+        ))
+    scrollFloorList(0)
 
+def scrollFloorList(rows): # scrolls the floor list by rows (clamped) and moves the shown buttons into place
+    global floorScroll
+    floorScroll = max(0, min(floorScroll + rows, len(floors) - floorListRows))
+    for i, floorButton in enumerate(floorButtons):
+        floorButton.moveTo(1275, floorListRect.y + (i - floorScroll) * floorRowPx + 15)
 
-floors = [{ 'name' : 'Floor 1' , 'cells' : {}}]
+def shownFloors(): # indices of the floors whose buttons fit in the list
+    return range(floorScroll, min(len(floors), floorScroll + floorListRows))
+
+
+sidebarWidth = 330
+gridScalePx = 15 # initial zoom; the canvas is an unbounded, chunked grid viewed through a pan/zoom viewport
+panStepPx = 60 # arrow-key pan distance
+
+floorCanvas = canvas.Canvas((0, 0, windowSize[0] - sidebarWidth, windowSize[1]), gridScalePx)
+sidebarRect = pygame.Rect(floorCanvas.rect.right, 0, sidebarWidth, windowSize[1])
+
+floors = [layers.Floor('Floor 1')]
 selectedFloor = 0
 
+# the floor list scrolls (mouse wheel) inside the space above the tool rows, so no floor button ever sits under a tool
+floorRowPx = 35
+floorListRect = pygame.Rect(sidebarRect.x, 145, sidebarWidth, autoWallsButton.rect.top - 10 - 145)
+floorListRows = (floorListRect.height + floorRowPx - 30) // floorRowPx # a row is a 30px button plus spacing
+floorScroll = 0 # first floor shown
+
 floorButtons = []
+syncFloorButtons()
+
+onionSkin = False # draws the floors above and below the selected one, faded
+onionDepth = 1 # floors shown on each side
+floorThumbnails = {} # floor -> (revision, thumbnail surface)
+thumbnailSize = 24
+
+selection = None # selected cell box (x0, y0, x1, y1) of the select tool
+selectAnchor = None # cell the selection drag started from
+clipboard = None # uint8 [x, y] mask copied, cut or taken from the prefab library; stamped by the paste brush
+selectionColor = (90, 200, 255)
+pasteColor = (255, 200, 90)
+
+try:
+    prefabLibrary = prefabs.load(prefabs.defaultLibraryPath)
+except (ValueError, OSError) as error:
+    print('prefab library not loaded:', error) # start with an empty library rather than not at all
+    prefabLibrary = []
+prefabIndex = 0
+prefabButton.setText(prefabText())
+
+exportJob = None # background gen.ExportJob, if one is running
 
 mode = 'walls'
 brush = 'draw'
 
-gridWidth = 60
-gridHeight = 60
-gridScalePx = 15
+wallStyles = [(8, 1), (8, 2), (4, 1), (4, 2)] # (connectivity, thickness) choices of the auto walls button
+wallStyle = 0
+
+editHistory = history.History() # undo/redo delta log; one step per brush stroke
+
+strokeCells = [] # (xs, ys) segments painted by this frame's mouse events
+lastStrokeCell = None # end of the previous segment while the button is held
+
+hudVisible = args.hud # F3 toggles the frame-time HUD
+hudPhases = ['frame', 'events', 'paint', 'canvas', 'cellWindow', 'gridLines', 'onionSkin', 'widgets', 'tick', 'present']
+hudRefreshFrames = 15 # percentiles are recomputed this often, not every frame
+frameCount = 0
+settleFrames = settleFrameCount # frames left to draw before the loop may go idle
+
+if args.profile:
+    profiling.startProfile()
+if args.trace:
+    profiling.frameTimers.startTrace()
+    profiling.exportTimers.startTrace()
 
 ###### MAINLOOP ######
 
 running = True # Runs the game loop
 
 while running:
-    screen.fill((25,25,25))
-    floorSurface.fill((0, 0, 0, 0))
-    wallsSurface.fill((0, 0, 0, 0))
-
-    if pygame.mouse.get_pos()[0] < gridWidth * gridScalePx and pygame.mouse.get_pressed()[0]:
-        if brush == 'draw':
-            floors[selectedFloor]['cells'][*screenSpaceToPixels(pygame.mouse.get_pos()), mode] = True
-        if brush == 'erase':
-            try:
-                del floors[selectedFloor]['cells'][*screenSpaceToPixels(pygame.mouse.get_pos()), mode]
-            except Exception as e:
-                #print(e)
-                None
-    
-    for cell, bool in floors[selectedFloor]['cells'].items():
-        # print(cell, bool)
-        coords = (cell[0], cell[1])
-        typ = cell[2]
-
-        pygame.draw.rect(floorSurface if typ == 'floor' else wallsSurface, [255, 255, 255, (typ == mode)*200 + 55], [coords[0] * gridScalePx, coords[1] * gridScalePx, gridScalePx, gridScalePx])
-
-    screen.blit(floorSurface, [0, 0])
-    screen.blit(wallsSurface, [0, 0])
+    # frames are only drawn when something changed: idle, the loop sleeps in pygame.event.wait instead of ticking at fps
+    events = nextEvents()
+    if events or isAnimating():
+        settleFrames = settleFrameCount
+    elif settleFrames:
+        settleFrames -= 1
+    else:
+        continue
+
+    profiling.frameTimers.startFrame()
+    screen.fill((25,25,25), sidebarRect)
+    exposed = False # the window was uncovered or restored; its contents may be gone
+
+    # every mouse event is consumed so fast strokes stay gap-free, not just one sample per frame
+    for event in events:
+        if event.type == pygame.QUIT: # checks if program is quit, if so stops the code
+            running = False
+        elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+            exposed = True
+            floorCanvas.markAll()
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            lastStrokeCell = None
+            editHistory.beginStroke()
+            if brush in ('draw', 'erase'):
+                strokeTo(event.pos)
+            elif not floorCanvas.rect.collidepoint(event.pos):
+                pass
+            elif brush == 'bucket':
+                bucketFill(event.pos)
+            elif brush == 'select':
+                selectAnchor = screenSpaceToPixels(event.pos)
+                selection = cellBox(selectAnchor, selectAnchor)
+            elif brush == 'paste' and clipboard is not None:
+                # shift-click stamps the same cells on every floor
+                pasteAt(event.pos, range(len(floors)) if pygame.key.get_mods() & pygame.KMOD_SHIFT else [selectedFloor])
+        elif event.type == pygame.MOUSEMOTION and event.buttons[0]:
+            if brush in ('draw', 'erase'):
+                strokeTo(event.pos)
+            elif brush == 'select' and selectAnchor is not None:
+                selection = cellBox(selectAnchor, screenSpaceToPixels(event.pos))
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            lastStrokeCell = None
+            selectAnchor = None
+            editHistory.endStroke()
+        elif event.type == pygame.MOUSEMOTION and (event.buttons[1] or event.buttons[2]):
+            floorCanvas.pan(*event.rel) # middle/right drag pans the view
+        elif event.type == pygame.MOUSEWHEEL and floorCanvas.rect.collidepoint(pygame.mouse.get_pos()):
+            floorCanvas.zoomAt(pygame.mouse.get_pos(), event.y)
+        elif event.type == pygame.MOUSEWHEEL and floorListRect.collidepoint(pygame.mouse.get_pos()):
+            scrollFloorList(-event.y)
+        elif event.type == pygame.KEYDOWN and not event.mod & pygame.KMOD_CTRL:
+            if event.key == pygame.K_F3:
+                hudVisible = not hudVisible
+                if not hudVisible:
+                    floorCanvas.markRect(hudTable.rect) # repaint the cells the HUD was covering
+            elif event.key == pygame.K_F5:
+                if profiling.isProfiling():
+                    profilePath = args.profile or f"profile_{int(time.time())}.prof"
+                    profiling.stopProfile(profilePath)
+                    print('wrote profile', profilePath)
+                else:
+                    profiling.startProfile()
+                    print('profiling... (F5 to stop)')
+            elif event.key == pygame.K_LEFT:
+                floorCanvas.pan(panStepPx, 0)
+            elif event.key == pygame.K_RIGHT:
+                floorCanvas.pan(-panStepPx, 0)
+            elif event.key == pygame.K_UP:
+                floorCanvas.pan(0, panStepPx)
+            elif event.key == pygame.K_DOWN:
+                floorCanvas.pan(0, -panStepPx)
+            elif event.key == pygame.K_r:
+                transformClipboard(turns=1)
+            elif event.key == pygame.K_m:
+                transformClipboard(mirrored=True)
+            elif event.key == pygame.K_ESCAPE:
+                selection = None
+                if brush == 'paste':
+                    brush = 'draw'
+        elif event.type == pygame.KEYDOWN and event.mod & pygame.KMOD_CTRL:
+            if event.key == pygame.K_z and not event.mod & pygame.KMOD_SHIFT:
+                changes = editHistory.undo(floors)
+            elif event.key in (pygame.K_y, pygame.K_z):
+                changes = editHistory.redo(floors)
+            else:
+                changes = []
+                if event.key == pygame.K_c:
+                    copySelection()
+                elif event.key == pygame.K_x:
+                    cutSelection()
+                elif event.key == pygame.K_v and clipboard is not None:
+                    brush = 'paste' # the clipboard follows the mouse until clicked; works across floors
+            for floorIndex, xs, ys in changes:
+                floorCanvas.markCells(floors[floorIndex], xs, ys)
+
+    profiling.frameTimers.lap("events")
+
+    if strokeCells:
+        # one batched write per frame; cells already in the brush's state are skipped
+        changedXs, changedYs = floors[selectedFloor].paint(
+            np.concatenate([xs for xs, ys in strokeCells]),
+            np.concatenate([ys for xs, ys in strokeCells]),
+            mode, brush == 'draw'
+        )
+        floorCanvas.markCells(floors[selectedFloor], changedXs, changedYs)
+        editHistory.record(selectedFloor, mode, changedXs, changedYs, brush != 'draw')
+        strokeCells = []
+
+    # only the cells edited since last frame (or the visible chunks, after a floor/mode switch or pan/zoom) are repainted
+    profiling.frameTimers.lap("paint")
+    floorCanvas.setOutlines(canvasOutlines())
+    dirtyRects = floorCanvas.draw(screen, floors[selectedFloor], mode, onionNeighbours())
+    profiling.frameTimers.lap("canvas")
+
+    if hudVisible:
+        if frameCount % hudRefreshFrames == 0:
+            rows = profiling.hudLines(profiling.frameTimers, hudPhases)
+            if profiling.exportTimers.last:
+                exportTimes = profiling.exportSummary(profiling.exportTimers)
+                rows += [("last export", "floors", "stack", "save"),
+                         ("(ms)",) + tuple(f"{exportTimes[key] * 1000:.1f}" for key in ("floors", "stack", "save"))]
+            hudTable.setRows(rows)
+        dirtyRects.append(hudTable.draw(screen))
 
     # draws all the GUI elements to the screen using the GUI library
     appTitle.draw(screen)
     addFloorButton.draw(screen)
+    onionButton.draw(screen, mode=int(onionSkin))
+    deleteFloorButton.draw(screen)
+    autoWallsButton.draw(screen)
+    wallStyleButton.draw(screen)
     editWalls.draw(screen, mode=int(mode=='walls'))
     editFloor.draw(screen, mode=int(mode=='floor'))
 
     drawButton.draw(screen, mode=int(brush=='draw'))
+    bucketButton.draw(screen, mode=int(brush=='bucket'))
+    selectButton.draw(screen, mode=int(brush=='select'))
     eraseButton.draw(screen, mode=int(brush=='erase'))
+    storePrefabButton.draw(screen)
+    prefabButton.draw(screen)
+    stampButton.draw(screen, mode=int(brush=='paste'))
 
+    generateButton.draw(screen)
+    generateAllButton.draw(screen)
+
+    openButton.draw(screen)
+    saveButton.draw(screen)
     exportButton.draw(screen)
+    if exportJob is not None:
+        exportProgress.setProgress(exportJob.progress)
+        exportProgress.draw(screen)
 
     # detects if any GUI elements are interacted with, using GUI library
     if addFloorButton.isClicked():
-        floors.append({ 'name' : f'Floor {len(floors)}' , 'cells' : {}})
+        floors.append(layers.Floor(f'Floor {len(floors)}'))
+        syncFloorButtons()
+    if onionButton.isClicked():
+        onionSkin = not onionSkin
+    if deleteFloorButton.isClicked() and len(floors) > 1:
+        editHistory.floorRemoved(selectedFloor)
+        floorThumbnails.pop(floors[selectedFloor], None)
+        floorCanvas.forget(floors.pop(selectedFloor))
+        selectedFloor = min(selectedFloor, len(floors) - 1)
+        syncFloorButtons()
+    if autoWallsButton.isClicked() and not floors[selectedFloor].isEmpty():
+        # walls around the whole footprint of the floor in one array pass, undoable as one step
+        editHistory.beginStroke()
+        replaceRegion(selectedFloor, *layers.autoWallsRegion(floors[selectedFloor], *wallStyles[wallStyle]))
+        editHistory.endStroke()
+    if wallStyleButton.isClicked():
+        wallStyle = (wallStyle + 1) % len(wallStyles)
+        wallStyleButton.setText(wallStyleText())
     if editWalls.isClicked():
         mode = 'walls'
     if editFloor.isClicked():
         mode = 'floor'
     if drawButton.isClicked():
         brush = 'draw'
+    if bucketButton.isClicked():
+        brush = 'bucket'
     if eraseButton.isClicked():
         brush = 'erase'
+    if selectButton.isClicked():
+        brush = 'select'
+    if storePrefabButton.isClicked():
+        storePrefab()
+    if stampButton.isClicked() and prefabLibrary:
+        clipboard = prefabLibrary[prefabIndex].mask.copy()
+        brush = 'paste'
+    if prefabButton.isClicked() and prefabLibrary:
+        prefabIndex = (prefabIndex + 1) % len(prefabLibrary)
+        prefabButton.setText(prefabText())
+    if generateButton.isClicked():
+        generateFloors([selectedFloor])
+    if generateAllButton.isClicked():
+        generateFloors(list(range(len(floors))))
+    if openButton.isClicked():
+        path = askopenfilename(filetypes=[("Dungeon Project", "*" + project.projectExtension), ("Schematic", "*.schem")], title="Open Project")
+        opened = None
+        try:
+            if path and path.endswith('.schem'):
+                opened = gen.loadSchematic(path) or [layers.Floor('Floor 1')] # exported schematics are sliced back into floors
+            elif path:
+                opened = project.load(path) or [layers.Floor('Floor 1')] # only the shown floor gets decoded
+                opened[0].bounds() # decoded here, so a damaged data block is rejected like a damaged index
+        except ValueError as error:
+            print('open failed:', error)
+            opened = None
+        if opened is not None:
+            for floor in floors:
+                floorCanvas.forget(floor)
+            floorThumbnails.clear()
+            floors = opened
+            selectedFloor = 0
+            editHistory.clear()
+            syncFloorButtons()
+    if saveButton.isClicked():
+        # asksaveasfilename, not asksaveasfile: the latter truncates the file we may still be reading floors from
+        path = asksaveasfilename(defaultextension=project.projectExtension, filetypes=[("Dungeon Project", "*" + project.projectExtension)], title="Save Project")
+        if path:
+            try:
+                project.save(path, floors)
+            except OSError as error: # e.g. a read-only folder, or on Windows the mapped project being replaced
+                print('save failed:', error)
     if exportButton.isClicked():
-        gen.createSchematic(floors)
-
-    i = 0
-    floorButtons = []
-    for f in floors:
-        i += 1
-        floorButtons.append(gui.Button(
-            name=f"floor_{i}",
-            width=300,
-            height=30,
-            cornerRadius = 8,
-            color=[80, 80, 80],
-            text=f"Floor {i}",
-            x=1275,
-            y=i*35 + 125,
-            scale=1,
-            fontSize=17
-        ))
-    
-    i = -1
-    for floorButton in floorButtons:
-        i += 1
-        floorButton.draw(screen, mode=int(i == selectedFloor))
-        if floorButton.isClicked():
+        if exportJob is not None and not exportJob.done:
+            exportJob.cancel() # clicking again while exporting cancels the running job
+        else:
+            # the path is chosen here on the UI thread; the snapshot is exported on a worker thread
+            exportJob = gen.ExportJob(floors, gen.askSavePath())
+            exportButton.setText("Cancel Export")
+
+    if exportJob is not None and exportJob.done:
+        if exportJob.cancelled:
+            print('export cancelled')
+        elif exportJob.error is not None:
+            print('export failed:', exportJob.error)
+        else:
+            print('exported', exportJob.path)
+        exportJob = None
+        exportButton.setText("Export .schem")
+
+    for i in shownFloors():
+        floorButtons[i].draw(screen, mode=int(i == selectedFloor))
+        drawFloorThumbnail(floors[i], floorButtons[i])
+        if floorButtons[i].isClicked():
             selectedFloor = i
-    
-    for x in range(gridWidth + 1):
-        pygame.draw.line(screen, (40, 40, 40), [x * gridScalePx, 0], [x * gridScalePx, gridHeight * gridScalePx])
-    for y in range(gridHeight + 1):
-        pygame.draw.line(screen, (40, 40, 40), [0, y * gridScalePx], [gridWidth * gridScalePx, y * gridScalePx])
-
-
-    for event in pygame.event.get(): # checks if program is quit, if so stops the code
-        if event.type == pygame.QUIT:
-            running = False
+    if len(floors) > floorListRows: # scrollbar along the right edge of the list
+        barHeight = floorListRect.height * floorListRows // len(floors)
+        barY = floorListRect.y + (floorListRect.height - barHeight) * floorScroll // (len(floors) - floorListRows)
+        pygame.draw.rect(screen, (90, 90, 90), (floorListRect.right - 6, barY, 3, barHeight))
 
     if not pygame.mouse.get_pressed()[0]:
         gui.mouseTask = False
 
+    profiling.frameTimers.lap("widgets")
     # runs framerate wait time
     clock.tick(fps)
-    # update the screen
-    pygame.display.update()
+    profiling.frameTimers.lap("tick")
+    # update only the sidebar and the canvas rects that changed, or the whole window after it was exposed
+    if exposed:
+        pygame.display.update()
+    else:
+        pygame.display.update([sidebarRect] + dirtyRects)
+    profiling.frameTimers.lap("present")
+    profiling.frameTimers.commit()
+    frameCount += 1
+
+if profiling.isProfiling():
+    profilePath = args.profile or f"profile_{int(time.time())}.prof"
+    profiling.stopProfile(profilePath)
+    print('wrote profile', profilePath)
+if args.trace:
+    profiling.writeTrace(args.trace, profiling.frameTimers, profiling.exportTimers)
+    print('wrote trace', args.trace)
 
 # quit Pygame
 pygame.quit()
\ No newline at end of file
@@ -0,0 +1,368 @@
+"""
+nbt.py — Minimal big-endian NBT reader/writer for Dungeon Designer.
+
+Only what the exporters need: typed scalar wrappers, compounds, lists and the
+array tags, written straight into a gzip stream. Array payloads are NumPy
+arrays or bytes and are written in a single call, so a multi-megabyte
+BlockData costs one write instead of one Python call per block.
+
+Plain Python values are mapped to tags as follows:
+    dict  -> TAG_Compound
+    str   -> TAG_String
+    bytes -> TAG_Byte_Array
+Every other tag must be wrapped explicitly (Int, Short, List, LongArray, ...).
+Lists of many identical-layout compounds can be passed pre-encoded as a
+RawList.
+
+A TAG_Byte_Array can also be given as Segments: a list of pieces already
+deflated on their own with deflateSegment(). They are spliced into the gzip
+stream as they are (each piece is byte-aligned and self-contained thanks to a
+full flush), so an exporter can cache the compressed form of data that did not
+change and skip recompressing it.
+
+readFile() parses a gzipped NBT file back into the same representation
+(scalars as the wrapper classes, TAG_Byte_Array as bytes, the other arrays as
+IntArray/LongArray), so what it returns can be written again as it is. It
+decompresses as it goes, reading each array payload with one read() into a
+NumPy array, so large schematics never exist as per-value Python objects.
+"""
+
+import gzip
+import struct
+import time
+import zlib
+from typing import BinaryIO, List as ListType, NamedTuple
+
+import numpy as np
+
+
+# --------------------------------- TAG IDS ----------------------------------
+
+TAG_END = 0
+TAG_BYTE = 1
+TAG_SHORT = 2
+TAG_INT = 3
+TAG_LONG = 4
+TAG_FLOAT = 5
+TAG_DOUBLE = 6
+TAG_BYTE_ARRAY = 7
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+TAG_INT_ARRAY = 11
+TAG_LONG_ARRAY = 12
+
+
+# ------------------------------- TAG WRAPPERS -------------------------------
+
+class Byte(int):
+    tagId = TAG_BYTE
+
+
+class Short(int):
+    tagId = TAG_SHORT
+
+
+class Int(int):
+    tagId = TAG_INT
+
+
+class Long(int):
+    tagId = TAG_LONG
+
+
+class Float(float):
+    tagId = TAG_FLOAT
+
+
+class Double(float):
+    tagId = TAG_DOUBLE
+
+
+class List(list):
+    """
+    Homogeneous NBT list. `elementId` is required for empty lists and is
+    otherwise inferred from the first element.
+    """
+    tagId = TAG_LIST
+
+    def __init__(self, items=(), elementId: int = None):
+        super().__init__(items)
+        self.elementId = elementId
+
+
+class RawList:
+    """
+    TAG_List whose element payloads are already encoded back to back (e.g.
+    a NumPy record array of fixed-layout compounds), written in one call.
+    """
+    tagId = TAG_LIST
+
+    def __init__(self, elementId: int, count: int, payload: bytes):
+        self.elementId = elementId
+        self.count = count
+        self.payload = payload
+
+
+class IntArray:
+    tagId = TAG_INT_ARRAY
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=">i4")
+
+
+class LongArray:
+    tagId = TAG_LONG_ARRAY
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=">i8")
+
+
+# --------------------------------- WRITER -----------------------------------
+
+class Deflated(NamedTuple):
+    data: bytes   # raw deflate blocks, ending in a full flush
+    crc: int      # CRC-32 of the uncompressed bytes
+    length: int   # number of uncompressed bytes
+
+
+class Segments:
+    """
+    TAG_Byte_Array payload made of Deflated pieces, written without recompressing.
+    """
+
+    def __init__(self, pieces: ListType[Deflated]):
+        self.pieces = pieces
+
+
+def deflateSegment(data: bytes, compresslevel: int = 9) -> Deflated:
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return Deflated(compressor.compress(data) + compressor.flush(zlib.Z_FULL_FLUSH), zlib.crc32(data), len(data))
+
+
+def _tagIdOf(value) -> int:
+    if hasattr(value, "tagId"):
+        return value.tagId
+    if isinstance(value, dict):
+        return TAG_COMPOUND
+    if isinstance(value, str):
+        return TAG_STRING
+    if isinstance(value, (bytes, bytearray, memoryview, np.ndarray, Segments)):
+        return TAG_BYTE_ARRAY
+    raise TypeError(f"Cannot infer NBT tag for {type(value).__name__}; wrap it in an nbt tag class")
+
+
+def _writeString(stream: BinaryIO, text: str):
+    data = text.encode("utf-8")
+    stream.write(struct.pack(">H", len(data)))
+    stream.write(data)
+
+
+def _writePayload(stream: BinaryIO, tagId: int, value):
+    if tagId == TAG_BYTE:
+        stream.write(struct.pack(">b", value))
+    elif tagId == TAG_SHORT:
+        stream.write(struct.pack(">h", value))
+    elif tagId == TAG_INT:
+        stream.write(struct.pack(">i", value))
+    elif tagId == TAG_LONG:
+        stream.write(struct.pack(">q", value))
+    elif tagId == TAG_FLOAT:
+        stream.write(struct.pack(">f", value))
+    elif tagId == TAG_DOUBLE:
+        stream.write(struct.pack(">d", value))
+    elif tagId == TAG_BYTE_ARRAY and isinstance(value, Segments):
+        stream.write(struct.pack(">i", sum(piece.length for piece in value.pieces)))
+        for piece in value.pieces:
+            stream.writeDeflated(piece)
+    elif tagId == TAG_BYTE_ARRAY:
+        data = value.tobytes() if isinstance(value, np.ndarray) else bytes(value)
+        stream.write(struct.pack(">i", len(data)))
+        stream.write(data)
+    elif tagId == TAG_STRING:
+        _writeString(stream, value)
+    elif tagId == TAG_LIST and isinstance(value, RawList):
+        stream.write(struct.pack(">bi", value.elementId, value.count))
+        stream.write(value.payload)
+    elif tagId == TAG_LIST:
+        elementId = value.elementId if isinstance(value, List) and value.elementId is not None else None
+        if elementId is None:
+            elementId = _tagIdOf(value[0]) if len(value) else TAG_END
+        stream.write(struct.pack(">bi", elementId, len(value)))
+        for item in value:
+            _writePayload(stream, elementId, item)
+    elif tagId == TAG_COMPOUND:
+        for name, item in value.items():
+            _writeNamedTag(stream, name, item)
+        stream.write(b"\x00")
+    elif tagId in (TAG_INT_ARRAY, TAG_LONG_ARRAY):
+        stream.write(struct.pack(">i", len(value.values)))
+        stream.write(value.values.tobytes())
+    else:
+        raise ValueError(f"Unknown NBT tag id {tagId}")
+
+
+def _writeNamedTag(stream: BinaryIO, name: str, value):
+    tagId = _tagIdOf(value)
+    stream.write(struct.pack(">b", tagId))
+    _writeString(stream, name)
+    _writePayload(stream, tagId, value)
+
+
+# ---------------------------------- GZIP ------------------------------------
+
+def _gf2Times(matrix: ListType[int], vector: int) -> int:
+    total = 0
+    row = 0
+    while vector:
+        if vector & 1:
+            total ^= matrix[row]
+        vector >>= 1
+        row += 1
+    return total
+
+
+def _gf2Square(matrix: ListType[int]) -> ListType[int]:
+    return [_gf2Times(matrix, matrix[row]) for row in range(32)]
+
+
+def _crcZeroOperators(count: int) -> ListType[ListType[int]]:
+    """
+    GF(2) matrices that advance a CRC-32 over 2**k zero bytes, for k < count.
+    """
+    operator = [0xEDB88320] + [1 << row for row in range(31)]  # one zero bit
+    for _square in range(3):
+        operator = _gf2Square(operator)  # 2, 4, 8 zero bits
+    operators = [operator]
+    for _k in range(1, count):
+        operators.append(_gf2Square(operators[-1]))
+    return operators
+
+
+# Built once, like zlib's crc32_combine_gen tables; covers lengths below 2**64
+_crcZeroBytes = _crcZeroOperators(64)
+
+
+def crc32Combine(crc1: int, crc2: int, length2: int) -> int:
+    """
+    CRC-32 of A + B from crc32(A), crc32(B) and len(B), without the bytes
+    (zlib's crc32_combine, which the zlib module does not expose).
+    """
+    k = 0
+    while length2 > 0:
+        if length2 & 1:
+            crc1 = _gf2Times(_crcZeroBytes[k], crc1)
+        length2 >>= 1
+        k += 1
+    return crc1 ^ crc2
+
+
+class _GzipWriter:
+    """
+    Single-member gzip stream that also accepts pre-deflated pieces.
+    """
+
+    def __init__(self, f: BinaryIO, compresslevel: int):
+        self.f = f
+        self.compresslevel = compresslevel
+        self.compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.crc = 0
+        self.size = 0
+        extraFlags = b"\x02" if compresslevel == 9 else b"\x04" if compresslevel == 1 else b"\x00"
+        f.write(b"\x1f\x8b\x08\x00" + struct.pack("<I", int(time.time())) + extraFlags + b"\xff")
+
+    def write(self, data):
+        self.crc = zlib.crc32(data, self.crc)
+        self.size += len(data)
+        self.f.write(self.compressor.compress(data))
+
+    def writeDeflated(self, piece: Deflated):
+        # The full flush ends our output on a byte boundary and resets the
+        # compressor, so nothing written later refers back across the piece
+        self.f.write(self.compressor.flush(zlib.Z_FULL_FLUSH))
+        self.f.write(piece.data)
+        self.crc = crc32Combine(self.crc, piece.crc, piece.length)
+        self.size += piece.length
+
+    def close(self):
+        self.f.write(self.compressor.flush(zlib.Z_FINISH))
+        self.f.write(struct.pack("<II", self.crc, self.size & 0xFFFFFFFF))
+
+
+def writeFile(path: str, rootName: str, root: dict, compresslevel: int = 9):
+    """
+    Write `root` as a gzipped NBT file with a named root compound.
+    """
+    with open(path, "wb") as f:
+        stream = _GzipWriter(f, compresslevel)
+        stream.write(struct.pack(">b", TAG_COMPOUND))
+        _writeString(stream, rootName)
+        _writePayload(stream, TAG_COMPOUND, root)
+        stream.close()
+
+
+# --------------------------------- READER -----------------------------------
+
+_scalarFormats = {
+    TAG_BYTE: (">b", Byte),
+    TAG_SHORT: (">h", Short),
+    TAG_INT: (">i", Int),
+    TAG_LONG: (">q", Long),
+    TAG_FLOAT: (">f", Float),
+    TAG_DOUBLE: (">d", Double),
+}
+
+
+def _readExactly(stream: BinaryIO, size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise EOFError("truncated NBT data")
+    return data
+
+
+def _readString(stream: BinaryIO) -> str:
+    (size,) = struct.unpack(">H", _readExactly(stream, 2))
+    return _readExactly(stream, size).decode("utf-8")
+
+
+def _readPayload(stream: BinaryIO, tagId: int):
+    scalar = _scalarFormats.get(tagId)
+    if scalar is not None:
+        fmt, wrapper = scalar
+        return wrapper(struct.unpack(fmt, _readExactly(stream, struct.calcsize(fmt)))[0])
+    if tagId == TAG_BYTE_ARRAY:
+        (size,) = struct.unpack(">i", _readExactly(stream, 4))
+        return _readExactly(stream, size)
+    if tagId == TAG_STRING:
+        return _readString(stream)
+    if tagId == TAG_LIST:
+        elementId, size = struct.unpack(">bi", _readExactly(stream, 5))
+        return List((_readPayload(stream, elementId) for _item in range(size)), elementId=elementId)
+    if tagId == TAG_COMPOUND:
+        compound = {}
+        while True:
+            (itemId,) = struct.unpack(">b", _readExactly(stream, 1))
+            if itemId == TAG_END:
+                return compound
+            name = _readString(stream)
+            compound[name] = _readPayload(stream, itemId)
+    if tagId in (TAG_INT_ARRAY, TAG_LONG_ARRAY):
+        (size,) = struct.unpack(">i", _readExactly(stream, 4))
+        dtype = ">i4" if tagId == TAG_INT_ARRAY else ">i8"
+        values = np.frombuffer(_readExactly(stream, size * np.dtype(dtype).itemsize), dtype=dtype)
+        return IntArray(values) if tagId == TAG_INT_ARRAY else LongArray(values)
+    raise ValueError(f"Unknown NBT tag id {tagId}")
+
+
+def readFile(path: str):
+    """
+    Read a gzipped (or uncompressed) NBT file. Returns (rootName, root).
+    """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rb") if compressed else open(path, "rb")) as stream:
+        (tagId,) = struct.unpack(">b", _readExactly(stream, 1))
+        if tagId != TAG_COMPOUND:
+            raise ValueError(f"NBT root must be a compound, not tag {tagId}")
+        name = _readString(stream)
+        return name, _readPayload(stream, TAG_COMPOUND)
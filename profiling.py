@@ -0,0 +1,205 @@
+"""
+profiling.py — Lightweight instrumentation for Dungeon Designer.
+
+Timers collects named phase timings, either as blocks or as laps:
+
+    frameTimers.startFrame()
+    with frameTimers.phase("canvas"):
+        ...
+    frameTimers.lap("widgets")  # time since the previous lap
+    frameTimers.commit()        # once per frame (or per export)
+
+Time spent in each phase is summed until commit(), which pushes the totals
+into a rolling history per name, so stats() can report percentiles over the
+last few hundred frames. Entering a phase costs two perf_counter() calls and a
+dict update; nothing else happens unless a trace is being recorded.
+
+While recording (startTrace), every phase is also kept as an event and
+writeTrace(path, *timers) saves them in the Chrome trace-event JSON format, viewable in
+chrome://tracing or https://ui.perfetto.dev. For function-level detail use
+startProfile()/stopProfile(), which wrap cProfile and dump a .prof file for
+`python -m pstats` or snakeviz.
+
+Two shared instances exist: frameTimers for the editor loop (main thread)
+and exportTimers for schematic exports (whichever thread runs them).
+"""
+
+import cProfile
+import json
+import os
+import threading
+from collections import deque
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+# ----------------------------- CONFIG CONSTANTS -----------------------------
+
+defaultHistory = 240  # committed samples kept per phase (4 s at 60 fps)
+
+
+# ---------------------------------- TIMERS ----------------------------------
+
+class _Phase:
+    __slots__ = ("timers", "name", "start")
+
+    def __init__(self, timers: "Timers", name: str):
+        self.timers = timers
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timers.record(self.name, self.start, perf_counter() - self.start)
+        return False
+
+
+class Timers:
+    def __init__(self, history: int = defaultHistory):
+        self.history = history
+        self.phases = {}   # name -> reusable _Phase
+        self.current = {}  # name -> seconds accumulated since the last commit
+        self.samples = {}  # name -> deque of committed seconds
+        self.last = {}     # name -> seconds of the last commit
+        self.trace = None  # list of (name, start, seconds, thread) while recording
+        self.frameStart = None  # set by startFrame(), for laps and the "frame" total
+        self.lapStart = None
+
+    def phase(self, name: str) -> _Phase:
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = _Phase(self, name)
+        return phase
+
+    def add(self, name: str, seconds: float):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+
+    def record(self, name: str, start: float, seconds: float):
+        self.current[name] = self.current.get(name, 0.0) + seconds
+        if self.trace is not None:
+            self.trace.append((name, start, seconds, threading.get_ident()))
+
+    def startFrame(self):
+        self.frameStart = self.lapStart = perf_counter()
+
+    def lap(self, name: str):
+        """
+        Charge the time since the previous lap (or startFrame) to `name`; an
+        alternative to phase() for code that runs as one flat sequence.
+        """
+        now = perf_counter()
+        if self.lapStart is not None:
+            self.record(name, self.lapStart, now - self.lapStart)
+        self.lapStart = now
+
+    def commit(self):
+        """
+        Close the current frame (or run): push the accumulated totals into history.
+        After startFrame(), the whole frame is recorded as "frame" too.
+        """
+        if self.frameStart is not None:
+            self.record("frame", self.frameStart, perf_counter() - self.frameStart)
+            self.frameStart = self.lapStart = None
+        current, self.current = self.current, {}
+        for name, seconds in current.items():
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.history)
+            samples.append(seconds)
+        self.last = current
+
+    def discard(self):
+        """
+        Drop what was accumulated since the last commit.
+        """
+        self.current = {}
+
+    def stats(self, name: str, percentiles=(50, 95, 99)) -> Tuple[float, ...]:
+        """
+        Percentiles in milliseconds of a phase over its rolling history.
+        """
+        samples = self.samples.get(name)
+        if not samples:
+            return tuple(0.0 for _ in percentiles)
+        return tuple(float(v) for v in np.percentile(np.fromiter(samples, dtype=float, count=len(samples)) * 1000, percentiles))
+
+    # ---- TRACING ----
+
+    def startTrace(self):
+        self.trace = []
+
+    def stopTrace(self) -> list:
+        trace, self.trace = self.trace or [], None
+        return trace
+
+
+frameTimers = Timers()
+exportTimers = Timers()
+
+
+def writeTrace(path: str, *timers: Timers):
+    """
+    Stop recording on the given timers and save their phases to one Chrome
+    trace-event file (each thread shows up as its own track).
+    """
+    events = [
+        {"name": name, "ph": "X", "ts": start * 1e6, "dur": seconds * 1e6, "pid": os.getpid(), "tid": thread}
+        for t in timers for name, start, seconds, thread in t.stopTrace()
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+# --------------------------------- CPROFILE ---------------------------------
+
+_profiler = None
+
+
+def startProfile():
+    global _profiler
+    if _profiler is None:
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+
+
+def stopProfile(path: str):
+    """
+    Stop the running cProfile session (if any) and dump it to `path`.
+    """
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def isProfiling() -> bool:
+    return _profiler is not None
+
+
+# ----------------------------------- HUD ------------------------------------
+
+def hudLines(timers: Timers, phases: List[str]) -> List[Tuple[str, ...]]:
+    """
+    Rows for an on-screen table: a header, then name / p50 / p95 / p99 (ms)
+    per phase in `phases` that has samples.
+    """
+    rows = [("phase", "p50", "p95", "p99")]
+    for name in phases:
+        if name in timers.samples:
+            rows.append((name,) + tuple(f"{value:.2f}" for value in timers.stats(name)))
+    return rows
+
+
+def exportSummary(timers: Timers) -> Dict[str, float]:
+    """
+    Totals of the last export: seconds spent on floors, stacking and saving.
+    """
+    last = timers.last
+    floors = sum(seconds for name, seconds in last.items() if name.startswith("floor "))
+    return {"floors": floors, "stack": last.get("stack", 0.0), "save": last.get("save", 0.0)}
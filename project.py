@@ -0,0 +1,193 @@
+"""
+project.py — Binary project files (.dungeon) for Dungeon Designer.
+
+Layout (all integers little-endian):
+
+    header      magic b"DDPJ", formatVersion u16, flags u16, floorCount u32
+    floor index one entry per floor:
+                    originX i32, originY i32, width u32, height u32,
+                    dataOffset u64, dataLength u64, compressed u8,
+                    nameLength u16, name (utf-8)
+    floor data  per floor: the floor channel then the walls channel of the
+                dense [x, y] grid covering its chunks, each bit-packed with np.packbits (8 cells/byte),
+                optionally zlib-compressed as one block
+
+The file is opened through mmap and only the index is parsed up front. Each
+floor comes back as a lazy layers.Floor that decodes its own data block the
+first time its grid is touched, so opening a 200-floor project only decodes
+the floor the editor is showing. load() returns the plain list of Floors that
+gen.createSchematic consumes.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from typing import List, Tuple, Union
+
+import numpy as np
+
+import layers
+
+
+# ----------------------------- CONFIG CONSTANTS -----------------------------
+
+projectExtension = ".dungeon"
+
+magic = b"DDPJ"
+formatVersion = 1
+
+headerFormat = struct.Struct("<4sHHI")
+entryFormat = struct.Struct("<iiIIQQBH")
+
+compressionLevel = 6
+
+
+# ------------------------------- CELL PACKING -------------------------------
+
+def packMask(mask: np.ndarray, compress: bool = True) -> bytes:
+    """
+    A uint8 [x, y] mask as its floor channel then its walls channel, each
+    bit-packed (8 cells/byte), optionally zlib-compressed as one block.
+    """
+    data = np.packbits(mask & layers.FLOOR).tobytes() + np.packbits(mask & layers.WALLS).tobytes()
+    return zlib.compress(data, compressionLevel) if compress else data
+
+
+def unpackMask(data: bytes, width: int, height: int, compressed: bool = True) -> np.ndarray:
+    """
+    Inverse of packMask(): the width×height uint8 [x, y] mask.
+    """
+    if compressed:
+        data = zlib.decompress(data)
+    cells = width * height
+    channelBytes = (cells + 7) // 8
+    packed = np.frombuffer(data, dtype=np.uint8, count=2 * channelBytes)
+    floorCells = np.unpackbits(packed[:channelBytes], count=cells)
+    wallCells = np.unpackbits(packed[channelBytes:], count=cells)
+    mask = floorCells * np.uint8(layers.FLOOR) | wallCells * np.uint8(layers.WALLS)
+    return mask.reshape(width, height)
+
+
+# --------------------------------- RECORDS ----------------------------------
+
+class _FloorRecord:
+    """
+    Where one floor's data block lives, and how to decode it.
+    Acts as the lazy `loader` of a layers.Floor.
+    """
+
+    def __init__(self, buffer, offset: int, length: int, compressed: bool,
+                 originX: int, originY: int, width: int, height: int):
+        # (buffer, offset) is swapped as one value so export threads decoding
+        # a snapshot never see a new buffer paired with an old offset
+        self.source = (buffer, offset)
+        self.length = length
+        self.compressed = compressed
+        self.originX = originX
+        self.originY = originY
+        self.width = width
+        self.height = height
+
+    def raw(self) -> bytes:
+        buffer, offset = self.source
+        return buffer[offset:offset + self.length]
+
+    def detach(self):
+        """
+        Copy the (still encoded) data block into memory so the mapping can be closed.
+        """
+        self.source = (bytes(self.raw()), 0)
+
+    def decode(self) -> Tuple[int, int, np.ndarray]:
+        try:
+            mask = unpackMask(self.raw(), self.width, self.height, self.compressed)
+        except zlib.error as error:
+            raise ValueError(f"damaged floor data: {error}") from error
+        return self.originX, self.originY, mask
+
+
+def _encodeFloor(floor: layers.Floor, compress: bool) -> Tuple[int, int, int, int, bytes]:
+    """
+    Encode the dense bounds of a floor's chunks; returns (originX, originY, width, height, data).
+    """
+    originX, originY, mask = floor.toDense()
+    return (originX, originY) + mask.shape + (packMask(mask, compress),)
+
+
+def _unpackAt(fmt: struct.Struct, buffer, position: int) -> tuple:
+    if position + fmt.size > len(buffer):
+        raise ValueError("truncated project")
+    return fmt.unpack_from(buffer, position)
+
+
+# ------------------------------- PUBLIC API --------------------------------
+
+def save(path: str, floors: List[Union[layers.Floor, dict]], compress: bool = True):
+    """
+    Write floors to a project file.
+
+    Floors that were loaded lazily and never touched are copied across in
+    their encoded form without being decoded.
+    """
+    floors = layers.toFloors(floors)
+
+    blocks = []
+    for floor in floors:
+        record = floor.loader if not floor.isLoaded else None
+        if isinstance(record, _FloorRecord):
+            # Untouched lazy floor: keep its bytes, and stop depending on the
+            # mapping, since we may be about to overwrite the file it lives in
+            record.detach()
+            blocks.append((record.originX, record.originY, record.width, record.height,
+                           record.raw(), record.compressed))
+        else:
+            blocks.append(_encodeFloor(floor, compress) + (compress,))
+
+    names = [floor.name.encode("utf-8") for floor in floors]
+    indexSize = sum(entryFormat.size + len(name) for name in names)
+    dataOffset = headerFormat.size + indexSize
+
+    tmpPath = path + ".tmp"
+    with open(tmpPath, "wb") as f:
+        f.write(headerFormat.pack(magic, formatVersion, 0, len(floors)))
+        for name, (originX, originY, width, height, data, compressed) in zip(names, blocks):
+            f.write(entryFormat.pack(originX, originY, width, height,
+                                     dataOffset, len(data), int(compressed), len(name)))
+            f.write(name)
+            dataOffset += len(data)
+        for *_entry, data, _compressed in blocks:
+            f.write(data)
+    os.replace(tmpPath, path)
+
+
+def load(path: str) -> List[layers.Floor]:
+    """
+    Open a project file. Only the floor index is read; each floor's grid is
+    decoded from the memory-mapped file on first access. A file that is not
+    a project, or whose header or index is cut short, raises ValueError; a
+    damaged data block raises ValueError when that floor is first decoded.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(magic)) != magic:
+            raise ValueError(f"{path} is not a Dungeon Designer project")
+        # The mapping stays valid after the file object is closed
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    _magic, version, _flags, floorCount = _unpackAt(headerFormat, buffer, 0)
+    if version > formatVersion:
+        raise ValueError(f"{path} uses project format {version}, newer than supported ({formatVersion})")
+
+    floors = []
+    position = headerFormat.size
+    for _ in range(floorCount):
+        originX, originY, width, height, offset, length, compressed, nameLength = _unpackAt(entryFormat, buffer, position)
+        position += entryFormat.size
+        if position + nameLength > len(buffer) or offset + length > len(buffer):
+            raise ValueError("truncated project")
+        name = buffer[position:position + nameLength].decode("utf-8")
+        position += nameLength
+
+        record = _FloorRecord(buffer, offset, length, bool(compressed), originX, originY, width, height)
+        floors.append(layers.Floor(name, loader=record))
+    return floors